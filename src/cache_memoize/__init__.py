@@ -1,18 +1,88 @@
 from functools import wraps
-import itertools
 import json
 import inspect
+import os
+import random
+import threading
+import time
 
 import hashlib
 from urllib.parse import quote
 
-from django.db import models
-from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.cache import DEFAULT_CACHE_ALIAS
 from django.core.cache.backends.base import DEFAULT_TIMEOUT
 
-from django.utils.encoding import force_bytes
+from . import dependencies, sharding, streaming
+from .adaptive import get_adaptive_policies, get_adaptive_policy
+from .breaker import CircuitBreaker, get_circuit_breaker
+from .disk import DiskStore
+from .exceptions import MAX_EXCEPTION_SIZE, CachedException
+from .profiler import Profiler, get_profile, get_profiles, publish_profiles
+from .replication import ReplicaSelector
+from .sizes import CompressedValue, SizeLimiter, get_size_stats, heaviest_functions
+from .utils import get_cache
+from .writer import BackgroundWriter, flush_writes, get_writer
+
+__all__ = [
+    "cache_memoize",
+    "CircuitBreaker",
+    "get_circuit_breaker",
+    "BackgroundWriter",
+    "DiskStore",
+    "flush_writes",
+    "get_profile",
+    "get_profiles",
+    "publish_profiles",
+    "get_adaptive_policies",
+    "get_size_stats",
+    "heaviest_functions",
+]
 
 MARKER = object()
+# What a cache operation returns when the circuit breaker skipped it or it
+# failed.
+UNAVAILABLE = object()
+
+# With `sliding=True`, a cache hit only extends the TTL (with `cache.touch`)
+# if the key wasn't touched within this fraction of the timeout already.
+SLIDING_TOUCH_FRACTION = 0.25
+# Upper bound of keys we remember the last touch time of, per function.
+SLIDING_MAX_KEYS = 10000
+
+
+def _escape(value):
+    # Cheaper than `quote`. Only the separators (and the escape character
+    # itself) need escaping for the keys to be unambiguous.
+    return value.replace("%", "%25").replace(":", "%3A").replace("=", "%3D")
+
+
+def _md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def _blake2b(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# How the default cache key is made: the quoting of the arguments and the
+# hash function. Version 1 is the original scheme.
+KEY_VERSIONS = {1: (quote, _md5), 2: (_escape, _blake2b)}
+
+
+def _obj_key(obj):
+    # Imported here, not at the top, because importing the ORM is slow and
+    # it's only needed for `extra` values that aren't JSON serializable.
+    from django.db import models
+
+    if isinstance(obj, models.Model):
+        return "%s.%s.%s" % (obj._meta.app_label, obj._meta.model_name, obj.pk)
+    elif hasattr(obj, "build_absolute_uri"):
+        return obj.build_absolute_uri()
+    elif inspect.isfunction(obj):
+        factors = [obj.__module__, obj.__name__]
+        return factors
+    else:
+        return str(obj)
 
 
 def cache_memoize(
@@ -26,6 +96,25 @@ def cache_memoize(
     store_result=True,
     cache_exceptions=(),
     cache_alias=DEFAULT_CACHE_ALIAS,
+    sliding=False,
+    circuit_breaker=None,
+    async_write=False,
+    profile=None,
+    track_size=False,
+    max_item_size=None,
+    oversize="skip",
+    persist=None,
+    track_dependencies=False,
+    stream_chunk_size=1000,
+    stream_window=10,
+    adaptive=False,
+    key_version=1,
+    migrate_from=None,
+    max_exception_size=MAX_EXCEPTION_SIZE,
+    once_per=None,
+    max_calls=1,
+    replicas=None,
+    replica_reads="random",
 ):
     """Decorator for memoizing function calls where we use the
     "local cache" to store the result.
@@ -48,6 +137,49 @@ def cache_memoize(
     immediately re-raise the exception and the function will not be executed.
     this tuple will be cached, all other will be propagated.
     :arg string cache_alias: The cache alias to use; defaults to 'default'.
+    Or a list of cache aliases to spread the cache keys over.
+    :arg bool sliding: If True, cache hits extend the expiration of the key
+    with `cache.touch`. At most once per key per quarter of the timeout.
+    :arg circuit_breaker: If True, the shared `CircuitBreaker` of the
+    `cache_alias` is used, or pass a `CircuitBreaker` instance. When the
+    cache backend fails or is too slow, it's bypassed for a while.
+    :arg async_write: If True, results are written to the cache in the
+    background by the shared `BackgroundWriter`, or pass a `BackgroundWriter`
+    instance.
+    :arg profile: If True, or the fraction of calls to sample, the calls are
+    counted per arguments in `.profile`.
+    :arg bool track_size: If True, the sizes of the stored results are kept
+    in `.size_stats`.
+    :arg int max_item_size: Results bigger than this many bytes (pickled)
+    aren't stored as is.
+    :arg string oversize: What to do with those; 'skip' (the default) or
+    'compress'.
+    :arg persist: A `DiskStore`, or the path of one, to also store the
+    results in.
+    :arg bool track_dependencies: If True, invalidating a memoized function
+    this one called also invalidates this one's result.
+    :arg int stream_chunk_size: For generator functions, the number of items
+    stored per cache key.
+    :arg int stream_window: For generator functions, the number of chunks
+    read from the cache at a time.
+    :arg adaptive: If True, or a dict of options for the `AdaptivePolicy`, the
+    cache is used less, or not at all, when it doesn't save time.
+    :arg int key_version: Which scheme to use for the default cache key; 1
+    (the default) or 2 (cheaper to compute, and doesn't use md5).
+    :arg int migrate_from: The `key_version` used before. Results stored
+    under the old keys are copied to the new keys.
+    :arg int max_exception_size: Cached exceptions are stored as their type
+    and arguments. If those pickled are bigger than this many bytes, only the
+    message, truncated to this length, is stored.
+    :arg int once_per: Instead of memoizing, don't call the function with the
+    same arguments more than `max_calls` times per this many seconds. The
+    other calls return None. When the cache is unavailable, the function is
+    called.
+    :arg int max_calls: How many calls `once_per` allows; defaults to 1.
+    :arg list replicas: Cache aliases to also store every result in. Reads
+    are spread over `cache_alias` and these.
+    :arg string replica_reads: How to pick where to read from; 'random' (the
+    default) or 'fastest'.
 
     Usage::
 
@@ -106,82 +238,563 @@ def cache_memoize(
         @cache_memoize(100, extra=lambda req: req.user.is_staff)
         def callmeonce(arg1):
             print(arg1)
+
+    If the cache backend is down or slow, the cache can make things slower
+    than no cache at all. With a circuit breaker, the backend is skipped for
+    a while after repeated failures::
+
+        @cache_memoize(100, circuit_breaker=CircuitBreaker(operation_timeout=0.1))
+        def callmeonce(arg1):
+            print(arg1)
+
+    To not make the caller wait for the result to be written to the cache,
+    it can be written in the background instead::
+
+        @cache_memoize(100, async_write=True)
+        def callmeonce(arg1):
+            print(arg1)
+
+        callmeonce('peter')
+        flush_writes()  # wait for queued writes, e.g. in tests
+
+    To find out which arguments cause the most calls, misses or compute
+    time, sample some of the calls into a profile::
+
+        @cache_memoize(100, profile=0.01)  # 1% of the calls
+        def callmeonce(arg1):
+            print(arg1)
+
+        callmeonce.profile.top(10, by="misses")
+
+    To protect the cache from results that are too big, and to find out
+    which functions store the most::
+
+        @cache_memoize(100, max_item_size=100_000, oversize="compress")
+        def callmeonce(arg1):
+            print(arg1)
+
+        heaviest_functions(10)
+
+    Results that are very expensive to compute can also be stored on disk
+    so they survive the cache being flushed or restarted::
+
+        @cache_memoize(3600, persist="/var/cache/myproject/reports.sqlite")
+        def callmeonce(arg1):
+            print(arg1)
+
+    If a memoized function calls other memoized functions, invalidating
+    those can also invalidate its results::
+
+        @cache_memoize(100)
+        def get_user(user_id):
+            ...
+
+        @cache_memoize(3600, track_dependencies=True)
+        def render_profile(user_id):
+            return render(get_user(user_id))
+
+        get_user.invalidate(1)  # also invalidates render_profile(1)
+
+    Generator functions are memoized too. The items are stored, in chunks,
+    while they're being yielded and streamed back from the cache::
+
+        @cache_memoize(100, stream_chunk_size=500)
+        def export_rows(year):
+            for row in expensive_query(year):
+                yield row
+
+    If you're not sure caching a function is worth it, let it find out::
+
+        @cache_memoize(100, adaptive=True)
+        def callmeonce(arg1):
+            print(arg1)
+
+        callmeonce.adaptive.mode  # 'cache', 'sample' or 'bypass'
+
+    To not call a function more than once an hour, without storing the
+    result::
+
+        @cache_memoize(once_per=3600)
+        def callmeonce(arg1):
+            print(arg1)
+
+    To get many results at once, computing the misses in threads::
+
+        @cache_memoize(100)
+        def callmeonce(arg1):
+            print(arg1)
+
+        callmeonce.many([('peter',), ('paul',)], max_workers=4)
+
+    To switch to a newer cache key scheme without starting with an empty
+    cache, results stored under the old keys are copied forward::
+
+        @cache_memoize(100, key_version=2, migrate_from=1)
+        def callmeonce(arg1):
+            print(arg1)
+
+    If results should stay in the cache for as long as they are being used,
+    use `sliding=True`. Every hit then pushes the expiration forward::
+
+        @cache_memoize(60, sliding=True)
+        def callmeoften(arg1):
+            print(arg1)
     """
 
-    if args_rewrite is None:
+    if isinstance(cache_alias, (list, tuple)):
+        aliases = tuple(cache_alias)
+        ring = sharding.HashRing(aliases) if len(aliases) > 1 else None
+        cache_alias = aliases[0]
+    else:
+        aliases = (cache_alias,)
+        ring = None
 
-        def noop(*args):
-            return args
+    if replicas:
+        if ring is not None:
+            raise ValueError("replicas can't be used with more than one cache_alias")
+        if track_dependencies:
+            raise ValueError("replicas can't be used with track_dependencies")
+        selector = ReplicaSelector((cache_alias,) + tuple(replicas), replica_reads)
+        aliases = selector.aliases
+    else:
+        selector = None
 
-        args_rewrite = noop
+    if circuit_breaker is True:
+        breakers = {alias: get_circuit_breaker(alias) for alias in aliases}
+    elif circuit_breaker is not None:
+        breakers = dict.fromkeys(aliases, circuit_breaker)
+    else:
+        breakers = None
 
-    def obj_key(obj):
-        if isinstance(obj, models.Model):
-            return "%s.%s.%s" % (obj._meta.app_label, obj._meta.model_name, obj.pk)
-        elif hasattr(obj, "build_absolute_uri"):
-            return obj.build_absolute_uri()
-        elif inspect.isfunction(obj):
-            factors = [obj.__module__, obj.__name__]
-            return factors
+    if async_write is True:
+        async_write = get_writer()
+
+    if isinstance(persist, (str, os.PathLike)):
+        persist = DiskStore(persist)
+
+    if track_dependencies:
+        dependencies.enable()
+
+    def _alias(cache_key):
+        # The cache alias a cache key is stored in.
+        return cache_alias if ring is None else ring.get(cache_key)
+
+    def _cache_op(alias, operation, *args, default=None, raises=()):
+        if breakers is None:
+            return getattr(get_cache(alias), operation)(*args)
+        breaker = breakers.get(alias)
+        if breaker is None:
+            # Another function's cache alias, e.g. of a dependency.
+            if circuit_breaker is True:
+                breaker = get_circuit_breaker(alias)
+            else:
+                breaker = circuit_breaker
+            breakers[alias] = breaker
+        return breaker.call(alias, operation, *args, default=default, raises=raises)
+
+    def _copies(alias):
+        # The cache aliases a result is written to.
+        return (alias,) if selector is None else selector.aliases
+
+    def _everywhere(alias, operation, *args):
+        # The same operation on every copy, in parallel.
+        if selector is None:
+            _cache_op(alias, operation, *args)
         else:
-            return str(obj)
+            sharding.fan_out(
+                lambda alias, _: _cache_op(alias, operation, *args),
+                dict.fromkeys(selector.aliases),
+            )
+
+    def _replica_read(operation, *args):
+        # Read from one of the replicas, or the next one if it's unavailable.
+        # Returns the alias read from and the result, or UNAVAILABLE.
+        for alias in selector.order():
+            t0 = time.perf_counter()
+            result = _cache_op(alias, operation, *args, default=UNAVAILABLE)
+            if result is UNAVAILABLE:
+                selector.record_failure(alias)
+                continue
+            selector.record(alias, time.perf_counter() - t0)
+            return alias, result
+        return None, UNAVAILABLE
+
+    def _replica_get_many(cache_keys):
+        # Read from one of the replicas. What it doesn't have (any more, or
+        # yet) is read from `cache_alias` and copied to it.
+        alias, found = _replica_read("get_many", cache_keys)
+        if found is UNAVAILABLE:
+            return {}
+        missing = [cache_key for cache_key in cache_keys if cache_key not in found]
+        if missing and alias != cache_alias:
+            copied = _cache_op(cache_alias, "get_many", missing, default={})
+            if copied:
+                _cache_op(alias, "set_many", copied, timeout)
+                found.update(copied)
+        return found
+
+    def _replica_get(cache_key):
+        # Same as `_replica_get_many` for one key.
+        alias, result = _replica_read("get", cache_key, MARKER)
+        if result is UNAVAILABLE:
+            return MARKER
+        if result is MARKER and alias != cache_alias:
+            result = _cache_op(cache_alias, "get", cache_key, MARKER, default=MARKER)
+            if result is not MARKER:
+                _cache_op(alias, "set", cache_key, result, timeout)
+        return result
+
+    if callable(extra):
+        extra_val = None
+    elif extra is None or isinstance(extra, (str, int, float)):
+        # Immutable, so it serializes the same way every time.
+        extra_val = json.dumps(extra, sort_keys=True, default=_obj_key)
+    else:
+        # Could be mutated (or be a model instance that gets saved) after
+        # decorating so it has to be serialized on every call.
+        extra_val = None
 
     def decorator(func):
-        def _default_make_cache_key(*args, **kwargs):
-            cache_key = ":".join(
-                itertools.chain(
-                    (quote(str(x)) for x in args_rewrite(*args)),
-                    (
-                        "{}={}".format(quote(k), quote(str(v)))
-                        for k, v in sorted(kwargs.items())
-                    ),
-                )
+        # Maps cache keys to when they were last set or touched (in this
+        # process). Only used when `sliding=True`.
+        last_touched = {}
+        last_touched_lock = threading.Lock()
+
+        def _slide(alias, cache_key, hit):
+            if timeout is DEFAULT_TIMEOUT:
+                timeout_ = get_cache(alias).default_timeout
+            else:
+                timeout_ = timeout
+            if not timeout_:
+                # Never expires (or is never stored), nothing to extend.
+                return
+            now = time.monotonic()
+            with last_touched_lock:
+                if hit:
+                    previous = last_touched.get(cache_key)
+                    if (
+                        previous is not None
+                        and now - previous < timeout_ * SLIDING_TOUCH_FRACTION
+                    ):
+                        return
+                if len(last_touched) >= SLIDING_MAX_KEYS:
+                    last_touched.clear()
+                last_touched[cache_key] = now
+            if hit:
+                _everywhere(alias, "touch", cache_key, timeout)
+
+        name = prefix or ".".join((func.__module__ or "", func.__qualname__))
+        key_prefix = "cache_memoize" + name
+
+        if profile:
+            profiler = Profiler(
+                name,
+                1.0 if profile is True else profile,
+                aliases[0],
+                breakers[aliases[0]] if breakers is not None else None,
             )
-            prefix_ = prefix or ".".join((func.__module__ or "", func.__qualname__))
-            extra_val = json.dumps(
-                extra(*args, **kwargs) if callable(extra) else extra,
-                sort_keys=True,
-                default=obj_key,
+        else:
+            profiler = None
+
+        if adaptive:
+            policy = get_adaptive_policy(
+                name, **(adaptive if isinstance(adaptive, dict) else {})
             )
-            return hashlib.md5(
-                force_bytes("cache_memoize" + prefix_ + cache_key + extra_val)
-            ).hexdigest()
+        else:
+            policy = None
+
+        if track_size or max_item_size is not None:
+            size_limiter = SizeLimiter(name, max_item_size, oversize)
+        else:
+            size_limiter = None
+
+        def _profile(cache_key, args, kwargs, hit, compute_time=None, result=None):
+            if args_rewrite is not None:
+                args = tuple(args_rewrite(*args))
+            profiler.record(cache_key, args, kwargs, hit, compute_time, result)
+
+        def _key_function(version):
+            try:
+                quote_, hash_ = KEY_VERSIONS[version]
+            except KeyError:
+                raise ValueError("Unknown key_version {!r}".format(version))
+            versioned_prefix = key_prefix if version == 1 else key_prefix + ":2:"
+
+            def _default_make_cache_key(*args, **kwargs):
+                parts = [
+                    quote_(str(x))
+                    for x in (args if args_rewrite is None else args_rewrite(*args))
+                ]
+                if kwargs:
+                    parts.extend(
+                        "{}={}".format(quote_(k), quote_(str(v)))
+                        for k, v in sorted(kwargs.items())
+                    )
+                if extra_val is None:
+                    extra_val_ = json.dumps(
+                        extra(*args, **kwargs) if callable(extra) else extra,
+                        sort_keys=True,
+                        default=_obj_key,
+                    )
+                else:
+                    extra_val_ = extra_val
+                return hash_(
+                    (versioned_prefix + ":".join(parts) + extra_val_).encode()
+                )
+
+            return _default_make_cache_key
+
+        if key_generator_callable is not None and migrate_from is not None:
+            raise ValueError("migrate_from can't be used with key_generator_callable")
+        _default_make_cache_key = _key_function(key_version)
+        if migrate_from is not None:
+            _make_old_cache_key = _key_function(migrate_from)
+        else:
+            _make_old_cache_key = None
 
         _make_cache_key = key_generator_callable or _default_make_cache_key
 
+        def _call(args, kwargs):
+            # If the function all raises an exception we want to cache,
+            # catch it, else let it propagate.
+            try:
+                return func(*args, **kwargs)
+            except cache_exceptions as exception:
+                return exception
+
+        def _call_tracking_dependencies(alias, cache_key, args, kwargs):
+            token = dependencies.collecting.set(set())
+            try:
+                result = _call(args, kwargs)
+                used = dependencies.collecting.get()
+            finally:
+                dependencies.collecting.reset(token)
+            if used:
+                dependencies.record(alias, cache_key, used, timeout, name, _cache_op)
+            return result
+
+        def _value(result):
+            # What to store in the cache for a result.
+            if not store_result:
+                # Then the result isn't valuable/important to store but
+                # we want to store something. Just to remember that
+                # it has be done.
+                return True
+            if isinstance(result, Exception):
+                return CachedException.pack(result, max_exception_size)
+            return result
+
+        def _load(value):
+            # A result from what's stored in the cache, or MARKER.
+            if type(value) is CompressedValue:
+                value = value.load()
+            if type(value) is CachedException:
+                value = value.load(MARKER)
+            return value
+
+        def _submit(alias, cache_key, value):
+            # Queue the write, to the alias and its replicas.
+            for copy in _copies(alias):
+                async_write.submit(
+                    copy,
+                    cache_key,
+                    value,
+                    timeout,
+                    breakers[copy] if breakers is not None else None,
+                )
+
+        def _store(alias, cache_key, value):
+            if size_limiter is not None:
+                value = size_limiter.prepare(value, MARKER)
+                if value is MARKER:
+                    return
+            if async_write:
+                _submit(alias, cache_key, value)
+            else:
+                _everywhere(alias, "set", cache_key, value, timeout)
+
+        def _persist_expires(alias):
+            # When the result expires in the cache, as a timestamp for the
+            # `DiskStore`. Not from `get_backend_timeout`, which is relative for
+            # some backends (Redis, Memcached).
+            if timeout is DEFAULT_TIMEOUT:
+                timeout_ = get_cache(alias).default_timeout
+            else:
+                timeout_ = timeout
+            if timeout_ is None:
+                return None
+            return time.time() + timeout_
+
+        def _migrate(alias, cache_key, args, kwargs):
+            # Get the result by the new key, or else the old one, in one go
+            # (unless they're in different shards).
+            old_cache_key = _make_old_cache_key(*args, **kwargs)
+            old_alias = _alias(old_cache_key)
+            if old_alias == alias:
+                found = _cache_op(
+                    alias, "get_many", [cache_key, old_cache_key], default={}
+                )
+            else:
+                found = {}
+                result = _cache_op(alias, "get", cache_key, MARKER, default=MARKER)
+                if result is MARKER:
+                    result = _cache_op(
+                        old_alias, "get", old_cache_key, MARKER, default=MARKER
+                    )
+                    if result is not MARKER:
+                        found[old_cache_key] = result
+                else:
+                    found[cache_key] = result
+            if cache_key in found:
+                return found[cache_key]
+            if old_cache_key in found:
+                result = found[old_cache_key]
+                _cache_op(alias, "set", cache_key, result, timeout)
+                return result
+            return MARKER
+
+        @wraps(func)
+        def inner_fast(*args, **kwargs):
+            # Same as `inner` below, without all the optional features.
+            _refresh = bool(kwargs.pop("_refresh", False)) if kwargs else False
+            cache_key = _make_cache_key(*args, **kwargs)
+            alias = cache_alias if ring is None else ring.get(cache_key)
+            collecting = dependencies.collecting.get()
+            if collecting is not None:
+                collecting.add((alias, cache_key))
+            cache = get_cache(alias)
+            result = MARKER if _refresh else cache.get(cache_key, MARKER)
+            # Compressed values too, stored under the same key by a decorator
+            # with `oversize="compress"` (e.g. before that was removed).
+            result = _load(result)
+            if result is MARKER:
+                result = _call(args, kwargs)
+                cache.set(cache_key, _value(result), timeout)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        def _acquire(alias, cache_key):
+            # Atomically take one of the `max_calls` per `once_per` seconds.
+            # When the cache is unavailable (the circuit breaker is open or
+            # the operation failed), the call is let through, the same way
+            # memoized functions are called directly then.
+            added = _cache_op(alias, "add", cache_key, 1, once_per, default=MARKER)
+            if added is MARKER or added:
+                # The first call this period.
+                return True
+            if max_calls == 1:
+                return False
+            try:
+                count = _cache_op(
+                    alias, "incr", cache_key, default=MARKER, raises=ValueError
+                )
+            except ValueError:
+                # Expired since the `add`.
+                added = _cache_op(alias, "add", cache_key, 1, once_per, default=MARKER)
+                return added is MARKER or added
+            return count is MARKER or count <= max_calls
+
+        def _release(alias, cache_key):
+            # Give the call back (when the function raised).
+            if max_calls == 1:
+                _cache_op(alias, "delete", cache_key)
+            else:
+                try:
+                    _cache_op(alias, "decr", cache_key, raises=ValueError)
+                except ValueError:
+                    pass
+
+        @wraps(func)
+        def inner_once(*args, **kwargs):
+            # For `once_per`. Nothing is stored but how many times the function
+            # was called with these arguments.
+            _refresh = bool(kwargs.pop("_refresh", False)) if kwargs else False
+            cache_key = _make_cache_key(*args, **kwargs)
+            alias = _alias(cache_key)
+            if _refresh:
+                _cache_op(alias, "delete", cache_key)
+            if not _acquire(alias, cache_key):
+                if hit_callable:
+                    hit_callable(*args, **kwargs)
+                return None
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                _release(alias, cache_key)
+                raise
+            if miss_callable:
+                miss_callable(*args, **kwargs)
+            return result
+
         @wraps(func)
         def inner(*args, **kwargs):
-            # The cache backend is fetched here (not in the outer decorator scope)
-            # to guarantee thread-safety at runtime.
-            cache = caches[cache_alias]
             # The cache key string should never be dependent on special keyword
             # arguments like _refresh. So extract it into a variable as soon as
             # possible.
-            _refresh = bool(kwargs.pop("_refresh", False))
+            _refresh = bool(kwargs.pop("_refresh", False)) if kwargs else False
             cache_key = _make_cache_key(*args, **kwargs)
+            alias = _alias(cache_key)
+            collecting = dependencies.collecting.get()
+            if collecting is not None:
+                collecting.add((alias, cache_key))
+            if policy is not None:
+                if policy.bypassing():
+                    return func(*args, **kwargs)
+                t0 = time.perf_counter()
             if _refresh:
                 result = MARKER
+            elif _make_old_cache_key is not None:
+                result = _migrate(alias, cache_key, args, kwargs)
+            elif selector is not None:
+                result = _replica_get(cache_key)
             else:
-                result = cache.get(cache_key, MARKER)
+                result = _cache_op(alias, "get", cache_key, MARKER, default=MARKER)
+            sampled = profiler is not None and random.random() < profiler.sample_rate
+            if result is MARKER and persist is not None and not _refresh:
+                result = persist.get(cache_key, MARKER)
+                if result is not MARKER:
+                    # Bring it back into the cache.
+                    _store(alias, cache_key, result)
+            result = _load(result)
             if result is MARKER:
-                # If the function all raises an exception we want to cache,
-                # catch it, else let it propagate.
-                try:
-                    result = func(*args, **kwargs)
-                except cache_exceptions as exception:
-                    result = exception
-
-                if not store_result:
-                    # Then the result isn't valuable/important to store but
-                    # we want to store something. Just to remember that
-                    # it has be done.
-                    cache.set(cache_key, True, timeout)
+                if policy is not None:
+                    cache_time = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                if track_dependencies:
+                    result = _call_tracking_dependencies(
+                        alias, cache_key, args, kwargs
+                    )
                 else:
-                    cache.set(cache_key, result, timeout)
+                    result = _call(args, kwargs)
+                compute_time = time.perf_counter() - t0
+
+                value = _value(result)
+                if sampled:
+                    _profile(cache_key, args, kwargs, False, compute_time, value)
+                if persist is not None:
+                    persist.set(cache_key, value, _persist_expires(alias))
+                if policy is None:
+                    _store(alias, cache_key, value)
+                elif policy.should_store():
+                    t0 = time.perf_counter()
+                    _store(alias, cache_key, value)
+                    cache_time += time.perf_counter() - t0
+                if policy is not None:
+                    policy.record(False, cache_time, compute_time)
+                if sliding:
+                    _slide(alias, cache_key, False)
                 if miss_callable:
                     miss_callable(*args, **kwargs)
-            elif hit_callable:
-                hit_callable(*args, **kwargs)
+            else:
+                if policy is not None:
+                    policy.record(True, time.perf_counter() - t0)
+                if sampled:
+                    _profile(cache_key, args, kwargs, True)
+                if sliding:
+                    _slide(alias, cache_key, True)
+                if hit_callable:
+                    hit_callable(*args, **kwargs)
 
             # If the result is an exception we've caught and cached, raise it
             # in the end as to not change the API of the function we're caching.
@@ -189,20 +802,312 @@ def cache_memoize(
                 raise result
             return result
 
+        @wraps(func)
+        def inner_stream(*args, **kwargs):
+            # For generator functions. The items are stored in chunks while
+            # they're being yielded and streamed back from the cache.
+            _refresh = bool(kwargs.pop("_refresh", False)) if kwargs else False
+            cache_key = _make_cache_key(*args, **kwargs)
+            # The chunks are stored in the same cache as the manifest.
+            alias = _alias(cache_key)
+            collecting = dependencies.collecting.get()
+            if collecting is not None:
+                collecting.add((alias, cache_key))
+            if _refresh:
+                manifest = None
+            else:
+                manifest = _cache_op(alias, "get", cache_key)
+
+            def store(key, value):
+                _cache_op(alias, "set", key, value, timeout)
+
+            def compute(skip=0):
+                yield from streaming.record(
+                    func(*args, **kwargs), store, cache_key, stream_chunk_size, skip
+                )
+                if miss_callable:
+                    miss_callable(*args, **kwargs)
+
+            if isinstance(manifest, streaming.StreamManifest):
+                if hit_callable:
+                    hit_callable(*args, **kwargs)
+                return streaming.replay(
+                    manifest,
+                    lambda keys: _cache_op(alias, "get_many", keys, default={}),
+                    cache_key,
+                    stream_window,
+                    compute,
+                )
+            return compute()
+
+        def _compute(cache_key, args):
+            if track_dependencies:
+                return _call_tracking_dependencies(
+                    _alias(cache_key), cache_key, args, {}
+                )
+            return _call(args, {})
+
+        def _compute_many(misses, max_workers, compute_timeout, executor):
+            # Returns the results (including cached exceptions) and the errors
+            # (exceptions that shouldn't be cached, and timeouts) by cache key.
+            results = {}
+            errors = {}
+            if not misses or (executor is None and max_workers is None):
+                for cache_key, args in misses.items():
+                    try:
+                        results[cache_key] = _compute(cache_key, args)
+                    except Exception as exception:
+                        errors[cache_key] = exception
+                return results, errors
+
+            import contextvars
+            from concurrent.futures import ThreadPoolExecutor, wait
+
+            own_executor = executor is None
+            if own_executor:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="cache_memoize"
+                )
+            try:
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run, _compute, cache_key, args
+                    ): cache_key
+                    for cache_key, args in misses.items()
+                }
+                done, not_done = wait(futures, compute_timeout)
+                for future in not_done:
+                    # Only cancels it if it hasn't started yet. Either way,
+                    # its result isn't used or stored.
+                    future.cancel()
+                    errors[futures[future]] = TimeoutError(
+                        "Not computed within {} seconds".format(compute_timeout)
+                    )
+                for future in done:
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as exception:
+                        errors[futures[future]] = exception
+            finally:
+                if own_executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            return results, errors
+
+        def many(
+            calls,
+            max_workers=None,
+            compute_timeout=None,
+            executor=None,
+            return_exceptions=False,
+        ):
+            """Return the results for a list of argument tuples, in order.
+
+            The cache is read with one `get_many` (which includes the old keys,
+            with `migrate_from`). With `max_workers` (or an `executor`), the
+            misses are computed concurrently in threads and those not done within
+            `compute_timeout` seconds are cancelled. The new results are written
+            with one `set_many`, or queued with `async_write`.
+            """
+            if wrapper is inner_stream:
+                raise TypeError("Generator functions can't be called in batches")
+            if wrapper is inner_once:
+                raise TypeError("Functions with once_per can't be called in batches")
+            if policy is not None:
+                # Its decisions are made per call, from the time each one took.
+                raise TypeError("Functions with adaptive can't be called in batches")
+            calls = [tuple(args) for args in calls]
+            cache_keys = [_make_cache_key(*args) for args in calls]
+            collecting = dependencies.collecting.get()
+            if collecting is not None:
+                collecting.update(
+                    (_alias(cache_key), cache_key) for cache_key in set(cache_keys)
+                )
+            if _make_old_cache_key is not None:
+                old_cache_keys = {
+                    cache_key: _make_old_cache_key(*args)
+                    for args, cache_key in zip(calls, cache_keys)
+                }
+                keys = set(cache_keys).union(old_cache_keys.values())
+            else:
+                old_cache_keys = None
+                keys = set(cache_keys)
+            if ring is None:
+                shards = {cache_alias: list(keys)}
+            else:
+                shards = ring.group(keys)
+            if selector is not None:
+                found = _replica_get_many(shards[cache_alias])
+            else:
+                found = {}
+                for found_in_shard in sharding.fan_out(
+                    lambda alias, keys: _cache_op(alias, "get_many", keys, default={}),
+                    shards,
+                ).values():
+                    found.update(found_in_shard)
+
+            results = {}
+            misses = {}
+            # Found by the old key only, to be copied over to the new key.
+            migrated = {}
+            for args, cache_key in zip(calls, cache_keys):
+                if cache_key in misses:
+                    continue
+                if cache_key not in results:
+                    result = _load(found.get(cache_key, MARKER))
+                    if result is MARKER and old_cache_keys is not None:
+                        value = found.get(old_cache_keys[cache_key], MARKER)
+                        result = _load(value)
+                        if result is not MARKER:
+                            migrated[cache_key] = value
+                    if result is MARKER:
+                        misses[cache_key] = args
+                        continue
+                    results[cache_key] = result
+                    if sliding and cache_key not in migrated:
+                        _slide(_alias(cache_key), cache_key, True)
+                if hit_callable:
+                    hit_callable(*args)
+
+            to_store = {}
+            if persist is not None:
+                for cache_key in list(misses):
+                    value = persist.get(cache_key, MARKER)
+                    result = _load(value)
+                    if result is not MARKER:
+                        results[cache_key] = result
+                        to_store[cache_key] = value
+                        del misses[cache_key]
+
+            computed, errors = _compute_many(
+                misses, max_workers, compute_timeout, executor
+            )
+            for cache_key, result in computed.items():
+                value = _value(result)
+                if persist is not None:
+                    persist.set(cache_key, value, _persist_expires(_alias(cache_key)))
+                results[cache_key] = result
+                to_store[cache_key] = value
+                if miss_callable:
+                    miss_callable(*misses[cache_key])
+            results.update(errors)
+
+            if size_limiter is not None:
+                to_store = {
+                    key: value
+                    for key, value in (
+                        (key, size_limiter.prepare(value, MARKER))
+                        for key, value in to_store.items()
+                    )
+                    if value is not MARKER
+                }
+            # Already prepared when it was stored under the old key.
+            to_store.update(migrated)
+            if sliding:
+                for cache_key in to_store:
+                    _slide(_alias(cache_key), cache_key, False)
+            if async_write:
+                for cache_key, value in to_store.items():
+                    _submit(_alias(cache_key), cache_key, value)
+                to_store = {}
+            if not to_store:
+                shards = {}
+            elif ring is None:
+                shards = dict.fromkeys(_copies(cache_alias), to_store)
+            else:
+                shards = {}
+                for cache_key, value in to_store.items():
+                    shards.setdefault(ring.get(cache_key), {})[cache_key] = value
+            sharding.fan_out(
+                lambda alias, data: _cache_op(alias, "set_many", data, timeout),
+                shards,
+            )
+
+            ordered = [results[cache_key] for cache_key in cache_keys]
+            if not return_exceptions:
+                for result in ordered:
+                    if isinstance(result, Exception):
+                        raise result
+            return ordered
+
+        def _invalidate_key(alias, cache_key, seen=None):
+            if wrapper is inner_stream:
+                manifest = _cache_op(alias, "get", cache_key)
+                if isinstance(manifest, streaming.StreamManifest):
+                    _cache_op(alias, "delete_many", manifest.chunk_keys(cache_key))
+            if async_write:
+                # Don't let a queued write bring back what's being deleted.
+                for copy in _copies(alias):
+                    async_write.discard(copy, cache_key)
+            _everywhere(alias, "delete", cache_key)
+            if persist is not None:
+                persist.delete(cache_key)
+            if dependencies.enabled:
+                dependencies.invalidate_dependents(alias, cache_key, seen, _cache_op)
+
+        if track_dependencies:
+            dependencies.register(name, _invalidate_key)
+
         def invalidate(*args, **kwargs):
-            # The cache backend is fetched here (not in the outer decorator scope)
-            # to guarantee thread-safety at runtime.
-            cache = caches[cache_alias]
-            kwargs.pop("_refresh", None)
+            if kwargs:
+                kwargs.pop("_refresh", None)
             cache_key = _make_cache_key(*args, **kwargs)
-            cache.delete(cache_key)
+            if _make_old_cache_key is not None:
+                old_cache_key = _make_old_cache_key(*args, **kwargs)
+                _everywhere(_alias(old_cache_key), "delete", old_cache_key)
+            _invalidate_key(_alias(cache_key), cache_key)
+
+        def _cache_get(key):
+            # For storing more than the result, like `cache_memoize_view`
+            # does: read and write other keys the same way as the results.
+            if selector is not None:
+                result = _replica_get(key)
+                return None if result is MARKER else result
+            return _cache_op(_alias(key), "get", key)
+
+        def _cache_set(key, value):
+            _everywhere(_alias(key), "set", key, value, timeout)
 
         def get_cache_key(*args, **kwargs):
-            kwargs.pop("_refresh", None)
+            if kwargs:
+                kwargs.pop("_refresh", None)
             return _make_cache_key(*args, **kwargs)
 
-        inner.invalidate = invalidate
-        inner.get_cache_key = get_cache_key
-        return inner
+        if once_per is not None:
+            if inspect.isgeneratorfunction(func):
+                raise ValueError("once_per can't be used with generator functions")
+            if selector is not None:
+                raise ValueError("once_per can't be used with replicas")
+            wrapper = inner_once
+        elif inspect.isgeneratorfunction(func):
+            if selector is not None:
+                raise ValueError("replicas can't be used with generator functions")
+            wrapper = inner_stream
+        elif (
+            hit_callable
+            or miss_callable
+            or sliding
+            or breakers is not None
+            or selector is not None
+            or async_write
+            or profiler is not None
+            or size_limiter is not None
+            or persist is not None
+            or track_dependencies
+            or policy is not None
+            or migrate_from is not None
+        ):
+            wrapper = inner
+        else:
+            wrapper = inner_fast
+        wrapper.invalidate = invalidate
+        wrapper.get_cache_key = get_cache_key
+        wrapper._cache_get = _cache_get
+        wrapper._cache_set = _cache_set
+        wrapper.many = many
+        wrapper.profile = profiler.profile if profiler is not None else None
+        wrapper.size_stats = size_limiter.stats if size_limiter is not None else None
+        wrapper.adaptive = policy
+        wrapper.replicas = selector
+        return wrapper
 
     return decorator
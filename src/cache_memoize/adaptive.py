@@ -0,0 +1,142 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("cache_memoize")
+
+CACHE = "cache"
+SAMPLE = "sample"
+BYPASS = "bypass"
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+class AdaptivePolicy:
+    """Decides, for one memoized function, whether caching is worth it.
+
+    Every `window` calls the time the cache saved (hits times the average
+    compute time) is compared with what it cost (the time spent in cache
+    gets and sets). If caching cost more than it saved:
+
+    * if at least `min_hit_ratio` of the calls were hits, only a
+      `sample_rate` fraction of the misses are stored from then on
+      ("sample" mode), which makes misses cheaper,
+    * otherwise, or if that didn't help either, the cache isn't used at all
+      for `bypass_period` seconds ("bypass" mode).
+
+    In "sample" mode, it goes back to "cache" mode as soon as a window saved
+    more than it cost again. After the bypass period, it starts over in
+    "cache" mode.
+    """
+
+    def __init__(
+        self,
+        name,
+        window=1000,
+        min_hit_ratio=0.05,
+        sample_rate=0.1,
+        bypass_period=300,
+    ):
+        self.name = name
+        self.window = window
+        self.min_hit_ratio = min_hit_ratio
+        self.sample_rate = sample_rate
+        self.bypass_period = bypass_period
+        self.mode = CACHE
+        # Kept between windows, since a window can be all hits.
+        self.average_compute_time = None
+        self.decisions = deque(maxlen=100)
+        self._bypass_until = None
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.calls = 0
+        self.hits = 0
+        self.cache_time = 0.0
+        self.compute_time = 0.0
+
+    def bypassing(self):
+        if self.mode != BYPASS:
+            return False
+        with self._lock:
+            if self.mode == BYPASS and time.monotonic() >= self._bypass_until:
+                self._switch(CACHE, "bypass period over")
+            return self.mode == BYPASS
+
+    def should_store(self):
+        return self.mode != SAMPLE or random.random() < self.sample_rate
+
+    def record(self, hit, cache_time, compute_time=0.0):
+        """`cache_time` is the time spent in the cache get (and set)."""
+        with self._lock:
+            self.calls += 1
+            self.cache_time += cache_time
+            if hit:
+                self.hits += 1
+            else:
+                self.compute_time += compute_time
+            if self.calls >= self.window:
+                self._evaluate()
+
+    def _evaluate(self):
+        misses = self.calls - self.hits
+        if misses:
+            self.average_compute_time = self.compute_time / misses
+        elif self.average_compute_time is None:
+            # Nothing to compare with.
+            self._reset_stats()
+            return
+        saved = self.hits * self.average_compute_time
+        hit_ratio = self.hits / self.calls
+        reason = "hit ratio {:.1%}, saved {:.3f}s, cost {:.3f}s".format(
+            hit_ratio, saved, self.cache_time
+        )
+        if saved >= self.cache_time:
+            if self.mode == SAMPLE:
+                self._switch(CACHE, reason)
+        else:
+            if self.mode == CACHE and hit_ratio >= self.min_hit_ratio:
+                self._switch(SAMPLE, reason)
+            else:
+                self._bypass_until = time.monotonic() + self.bypass_period
+                self._switch(BYPASS, reason)
+        self._reset_stats()
+
+    def _switch(self, mode, reason):
+        logger.info(
+            "Memoized function %s switched from %s to %s mode (%s)",
+            self.name,
+            self.mode,
+            mode,
+            reason,
+        )
+        self.decisions.append((time.time(), self.mode, mode, reason))
+        self.mode = mode
+        self._reset_stats()
+
+    def reset(self):
+        with self._lock:
+            self.mode = CACHE
+            self.average_compute_time = None
+            self._bypass_until = None
+            self._reset_stats()
+
+
+def get_adaptive_policy(name, **options):
+    """Return the AdaptivePolicy of a function, by name. The options are
+    only used when it's created the first time."""
+    with _policies_lock:
+        policy = _policies.get(name)
+        if policy is None:
+            policy = _policies[name] = AdaptivePolicy(name, **options)
+        return policy
+
+
+def get_adaptive_policies():
+    """All AdaptivePolicies, by function name."""
+    with _policies_lock:
+        return dict(_policies)
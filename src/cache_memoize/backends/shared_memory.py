@@ -0,0 +1,327 @@
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import (
+    DEFAULT_TIMEOUT,
+    BaseCache,
+    InvalidCacheBackendError,
+)
+from django.core.files import locks
+
+MAGIC = b"cmshm001"
+# magic, number of slots, slot size, LRU clock
+HEADER = struct.Struct("<8sIIQ")
+# state, key hash, expires (0 = never), last used, key length, value length
+SLOT_HEADER = struct.Struct("<BQdQHI")
+
+EMPTY = 0
+USED = 1
+DELETED = 2
+
+# Means "don't change the expiration" when touching a slot.
+KEEP = object()
+
+
+class SharedMemoryCache(BaseCache):
+    """A cache backend that stores entries in a memory-mapped file.
+
+    All processes on the same host that use the same file (the LOCATION)
+    share the entries, without any network I/O. Handy for memoizing
+    functions in a `multiprocessing` pool or a `ProcessPoolExecutor`.
+
+    The file is split into `SLOTS` fixed-size slots of `SLOT_SIZE` bytes
+    each (OPTIONS). A key is stored in the first free slot of the
+    `PROBE_LIMIT` slots following its hash. If they're all taken, the least
+    recently used one of them is evicted. Entries whose key and pickled value
+    don't fit in a slot aren't stored. All operations are serialized with a
+    lock on the file. A process that was forked opens the file again, so
+    that it doesn't share the lock with its parent.
+
+    A file that was created with other `SLOTS` or `SLOT_SIZE` isn't used, and
+    not changed either, since other processes may still be using it.
+
+    Example::
+
+        CACHES = {
+            "shared": {
+                "BACKEND": "cache_memoize.backends.shared_memory.SharedMemoryCache",
+                "LOCATION": "/tmp/myproject-cache",
+                "OPTIONS": {"SLOTS": 4096, "SLOT_SIZE": 8192},
+            },
+        }
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if not location:
+            raise ValueError("SharedMemoryCache needs a file path as LOCATION")
+        options = params.get("OPTIONS", {})
+        self._path = os.path.abspath(location)
+        self._slots = int(options.get("SLOTS", 1024))
+        self._slot_size = int(options.get("SLOT_SIZE", 4096))
+        self._probe_limit = min(int(options.get("PROBE_LIMIT", 16)), self._slots)
+        if self._slot_size <= SLOT_HEADER.size:
+            raise ValueError("SLOT_SIZE must be bigger than %d" % SLOT_HEADER.size)
+        self._size = HEADER.size + self._slots * self._slot_size
+        self._file = None
+        self._map = None
+        # The process that opened the file.
+        self._pid = None
+        # The file lock doesn't protect threads sharing this instance from
+        # each other.
+        self._thread_lock = threading.Lock()
+
+    def _open(self):
+        file = open(self._path, "a+b")
+        try:
+            locks.lock(file, locks.LOCK_EX)
+            try:
+                file.seek(0)
+                header = file.read(HEADER.size)
+                if not header:
+                    # A new file.
+                    file.write(HEADER.pack(MAGIC, self._slots, self._slot_size, 0))
+                    header = None
+                elif (
+                    len(header) < HEADER.size
+                    or HEADER.unpack(header)[:3]
+                    != (MAGIC, self._slots, self._slot_size)
+                ):
+                    raise InvalidCacheBackendError(
+                        "{} isn't a SharedMemoryCache file with these SLOTS and "
+                        "SLOT_SIZE. Use another LOCATION or remove it.".format(
+                            self._path
+                        )
+                    )
+                if os.fstat(file.fileno()).st_size < self._size:
+                    # New, or its creator didn't get to finish. Either way,
+                    # nobody can have mapped it yet.
+                    file.truncate(self._size)
+                    file.flush()
+            finally:
+                locks.unlock(file)
+            self._map = mmap.mmap(file.fileno(), self._size)
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+        self._pid = os.getpid()
+
+    def _reopen_after_fork(self):
+        # The open file (and so its lock) is shared with the parent process,
+        # so they wouldn't exclude each other. Another thread could have held
+        # the thread lock when forking, too.
+        self._thread_lock = threading.Lock()
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = self._pid = None
+
+    @contextmanager
+    def _locked(self):
+        if self._pid is not None and self._pid != os.getpid():
+            self._reopen_after_fork()
+        with self._thread_lock:
+            if self._map is None:
+                self._open()
+            locks.lock(self._file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(self._file)
+
+    def _tick(self):
+        magic, slots, slot_size, clock = HEADER.unpack_from(self._map, 0)
+        clock += 1
+        HEADER.pack_into(self._map, 0, magic, slots, slot_size, clock)
+        return clock
+
+    def _offset(self, index):
+        return HEADER.size + index * self._slot_size
+
+    @staticmethod
+    def _hash(key_bytes):
+        return int.from_bytes(
+            hashlib.blake2b(key_bytes, digest_size=8).digest(), "little"
+        )
+
+    def _find(self, key_bytes, key_hash):
+        """Return (index of the slot with the key or None, index of the best
+        slot to store the key in)."""
+        free = None
+        oldest = None
+        oldest_used = None
+        now = time.time()
+        start = key_hash % self._slots
+        for i in range(self._probe_limit):
+            index = (start + i) % self._slots
+            offset = self._offset(index)
+            state, slot_hash, expires, last_used, key_length, _ = (
+                SLOT_HEADER.unpack_from(self._map, offset)
+            )
+            if state == EMPTY:
+                return None, index if free is None else free
+            if state == DELETED or (expires and expires <= now):
+                if state == USED and slot_hash == key_hash:
+                    if self._slot_key(offset, key_length) == key_bytes:
+                        # Expired entry of the same key, reuse it.
+                        return None, index
+                if free is None:
+                    free = index
+                continue
+            if slot_hash == key_hash:
+                if self._slot_key(offset, key_length) == key_bytes:
+                    return index, index
+            if oldest_used is None or last_used < oldest_used:
+                oldest, oldest_used = index, last_used
+        return None, oldest if free is None else free
+
+    def _slot_key(self, offset, key_length):
+        start = offset + SLOT_HEADER.size
+        end = start + key_length
+        return self._map[start:end]
+
+    def _read(self, index):
+        offset = self._offset(index)
+        _, _, _, _, key_length, value_length = SLOT_HEADER.unpack_from(
+            self._map, offset
+        )
+        start = offset + SLOT_HEADER.size + key_length
+        end = start + value_length
+        return self._map[start:end]
+
+    def _write(self, index, key_bytes, key_hash, pickled, expires):
+        offset = self._offset(index)
+        SLOT_HEADER.pack_into(
+            self._map,
+            offset,
+            USED,
+            key_hash,
+            expires or 0.0,
+            self._tick(),
+            len(key_bytes),
+            len(pickled),
+        )
+        start = offset + SLOT_HEADER.size
+        end = start + len(key_bytes)
+        self._map[start:end] = key_bytes
+        value_end = end + len(pickled)
+        self._map[end:value_end] = pickled
+
+    def _set_state(self, index, state):
+        self._map[self._offset(index)] = state
+
+    def _touch_slot(self, index, expires=KEEP):
+        offset = self._offset(index)
+        state, key_hash, old_expires, _, key_length, value_length = (
+            SLOT_HEADER.unpack_from(self._map, offset)
+        )
+        SLOT_HEADER.pack_into(
+            self._map,
+            offset,
+            state,
+            key_hash,
+            old_expires if expires is KEEP else expires or 0.0,
+            self._tick(),
+            key_length,
+            value_length,
+        )
+
+    def _fits(self, key_bytes, pickled):
+        return SLOT_HEADER.size + len(key_bytes) + len(pickled) <= self._slot_size
+
+    def _key(self, key, version):
+        key_bytes = self.make_and_validate_key(key, version=version).encode()
+        return key_bytes, self._hash(key_bytes)
+
+    def _store(self, key, value, timeout, version, only_if_missing=False):
+        key_bytes, key_hash = self._key(key, version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        expires = self.get_backend_timeout(timeout)
+        with self._locked():
+            found, target = self._find(key_bytes, key_hash)
+            if found is not None and only_if_missing:
+                return False
+            if not self._fits(key_bytes, pickled):
+                # Like Memcached, too big values are not stored (and the
+                # old value is gone).
+                if found is not None:
+                    self._set_state(found, DELETED)
+                return False
+            self._write(target, key_bytes, key_hash, pickled, expires)
+            return True
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, only_if_missing=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version)
+
+    def get(self, key, default=None, version=None):
+        key_bytes, key_hash = self._key(key, version)
+        with self._locked():
+            found, _ = self._find(key_bytes, key_hash)
+            if found is None:
+                return default
+            self._touch_slot(found)
+            pickled = self._read(found)
+        return pickle.loads(pickled)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key_bytes, key_hash = self._key(key, version)
+        with self._locked():
+            found, _ = self._find(key_bytes, key_hash)
+            if found is None:
+                return False
+            self._touch_slot(found, self.get_backend_timeout(timeout))
+            return True
+
+    def delete(self, key, version=None):
+        key_bytes, key_hash = self._key(key, version)
+        with self._locked():
+            found, _ = self._find(key_bytes, key_hash)
+            if found is None:
+                return False
+            self._set_state(found, DELETED)
+            return True
+
+    def has_key(self, key, version=None):
+        key_bytes, key_hash = self._key(key, version)
+        with self._locked():
+            return self._find(key_bytes, key_hash)[0] is not None
+
+    def incr(self, key, delta=1, version=None):
+        key_bytes, key_hash = self._key(key, version)
+        with self._locked():
+            found, _ = self._find(key_bytes, key_hash)
+            if found is None:
+                raise ValueError("Key '%s' not found" % key)
+            offset = self._offset(found)
+            expires = SLOT_HEADER.unpack_from(self._map, offset)[2]
+            new_value = pickle.loads(self._read(found)) + delta
+            pickled = pickle.dumps(new_value, self.pickle_protocol)
+            if not self._fits(key_bytes, pickled):
+                raise ValueError("Value of key '%s' doesn't fit" % key)
+            self._write(found, key_bytes, key_hash, pickled, expires)
+        return new_value
+
+    def clear(self):
+        with self._locked():
+            empty = bytes(self._slot_size)
+            for index in range(self._slots):
+                offset = self._offset(index)
+                end = offset + self._slot_size
+                self._map[offset:end] = empty
+
+    def close(self, **kwargs):
+        # Nothing to do between requests. The file stays mapped for the
+        # lifetime of the backend instance.
+        pass
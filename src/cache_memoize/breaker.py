@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+
+from .utils import get_cache
+
+logger = logging.getLogger("cache_memoize")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(
+                max_workers=8, thread_name_prefix="cache_memoize_breaker"
+            )
+        return _executor
+
+
+def _run(cache_alias, operation, args):
+    # The cache backend is fetched in the worker thread since backends
+    # aren't necessarily safe to share between threads.
+    return getattr(get_cache(cache_alias), operation)(*args)
+
+
+class CircuitBreaker:
+    """Stops talking to a cache backend that is failing or too slow.
+
+    Every cache operation is timed. After `failure_threshold` consecutive
+    failures (exceptions, operations that took longer than `slow_threshold`
+    or didn't finish within `operation_timeout`) the breaker "opens" and all
+    operations are skipped, i.e. the memoized function is called directly,
+    for `recovery_timeout` seconds. After that, one operation is let through
+    as a probe. If it succeeds the breaker closes again, otherwise it stays
+    open for another `recovery_timeout` seconds.
+
+    :arg int failure_threshold: Consecutive failures before opening.
+    :arg float recovery_timeout: Seconds to wait before probing the backend.
+    :arg float operation_timeout: If not None, operations are run in a
+    background thread and abandoned after this many seconds.
+    :arg float slow_threshold: If not None, operations that succeed but take
+    longer than this many seconds count as failures.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=5,
+        recovery_timeout=30,
+        operation_timeout=None,
+        slow_threshold=None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.operation_timeout = operation_timeout
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if (
+                self._state == OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                return HALF_OPEN
+            return self._state
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def _allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                # Let exactly one caller through to probe the backend.
+                self._state = HALF_OPEN
+                return True
+            # Half-open, somebody else is already probing.
+            return False
+
+    def _record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Cache circuit breaker closed, backend recovered")
+            self._state = CLOSED
+            self._failures = 0
+
+    def _record_failure(self, reason):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        "Cache circuit breaker opened after %d failure(s) (%s)",
+                        self._failures,
+                        reason,
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, cache_alias, operation, *args, default=None, raises=()):
+        """Run `caches[cache_alias].<operation>(*args)` unless the breaker
+        is open. Returns `default` if the operation was skipped or failed.
+
+        The exceptions in `raises` are answers of the backend, like the
+        `ValueError` of `incr` for a missing key. They're raised and don't
+        count as failures."""
+        if not self._allow():
+            return default
+        t0 = time.monotonic()
+        try:
+            if self.operation_timeout is None:
+                result = _run(cache_alias, operation, args)
+            else:
+                future = _get_executor().submit(_run, cache_alias, operation, args)
+                try:
+                    result = future.result(timeout=self.operation_timeout)
+                except TimeoutError:
+                    future.cancel()
+                    raise
+        except raises:
+            self._record_success()
+            raise
+        except Exception as exception:
+            self._record_failure("{} {!r}".format(operation, exception))
+            return default
+        if (
+            self.slow_threshold is not None
+            and time.monotonic() - t0 > self.slow_threshold
+        ):
+            self._record_failure("{} too slow".format(operation))
+        else:
+            self._record_success()
+        return result
+
+
+def get_circuit_breaker(cache_alias, **options):
+    """Return the shared CircuitBreaker for a cache alias. The options are
+    only used when it's created the first time."""
+    with _breakers_lock:
+        try:
+            return _breakers[cache_alias]
+        except KeyError:
+            breaker = _breakers[cache_alias] = CircuitBreaker(**options)
+            return breaker
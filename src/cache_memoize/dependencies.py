@@ -0,0 +1,136 @@
+import contextvars
+import threading
+import time
+import weakref
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from .utils import get_cache
+
+DEPENDENTS_KEY_PREFIX = "cache_memoize:dependents:"
+
+# The dependents of a result are updated under a lock (taken with
+# `cache.add`) so that two results computed at the same time from it don't
+# overwrite each other. Seconds a lock is held at most, how long to wait for
+# one before updating without it, and how often to try meanwhile.
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 0.5
+LOCK_POLL = 0.005
+
+# While a function with `track_dependencies=True` is computing its result,
+# this is the set of (cache alias, cache key) of the memoized calls it made.
+collecting = contextvars.ContextVar("cache_memoize_dependencies", default=None)
+
+# Becomes True as soon as any function tracks its dependencies. Until then
+# invalidating doesn't need to look for dependents.
+enabled = False
+
+# The functions to invalidate the results of a memoized function with, by
+# its name. See `register`.
+_invalidators = {}
+_invalidators_lock = threading.Lock()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def _dependents_key(cache_key):
+    return DEPENDENTS_KEY_PREFIX + cache_key
+
+
+def register(name, invalidate):
+    """Let the cascade invalidate the results of the memoized function `name`
+    with `invalidate(cache_alias, cache_key, seen)`, so that they're also
+    deleted from disk, queued writes, stream chunks and so on."""
+    with _invalidators_lock:
+        _invalidators.setdefault(name, weakref.WeakSet()).add(invalidate)
+
+
+def _cache_op(cache_alias, operation, *args, default=None):
+    return getattr(get_cache(cache_alias), operation)(*args)
+
+
+def _lock(cache_alias, keys, cache_op):
+    # Returns the locks of `keys` that were taken. They're taken in order so
+    # that two of these don't wait for each other.
+    locked = []
+    deadline = time.monotonic() + LOCK_WAIT
+    for key in sorted(keys):
+        lock_key = key + ":lock"
+        while not cache_op(cache_alias, "add", lock_key, 1, LOCK_TIMEOUT, default=True):
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(LOCK_POLL)
+        else:
+            locked.append(lock_key)
+    return locked
+
+
+def record(cache_alias, cache_key, dependencies, timeout, name=None, cache_op=None):
+    """Remember that the result stored as `cache_key` (by the memoized
+    function `name`) was computed from the results stored as `dependencies`,
+    for as long as it's stored."""
+    cache_op = cache_op or _cache_op
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = get_cache(cache_alias).default_timeout
+    expires = None if timeout is None else time.time() + timeout
+    parent = (cache_alias, cache_key, name)
+    keys_by_alias = {}
+    for child_alias, child_key in dependencies:
+        if (child_alias, child_key) != (cache_alias, cache_key):
+            keys_by_alias.setdefault(child_alias, []).append(
+                _dependents_key(child_key)
+            )
+    for child_alias, keys in keys_by_alias.items():
+        locked = _lock(child_alias, keys, cache_op)
+        try:
+            found = cache_op(child_alias, "get_many", keys, default={})
+            now = time.time()
+            data = {}
+            for key in keys:
+                # A dict of (alias, key, function name) of dependents to when
+                # they expire.
+                dependents = {
+                    dependent: until
+                    for dependent, until in found.get(key, {}).items()
+                    if until is None or until > now
+                }
+                dependents[parent] = expires
+                data[key] = dependents
+            # Kept for as long as the longest stored dependent of any of them.
+            untils = [
+                until for dependents in data.values() for until in dependents.values()
+            ]
+            child_timeout = None if None in untils else max(untils) - now
+            cache_op(child_alias, "set_many", data, child_timeout)
+        finally:
+            if locked:
+                cache_op(child_alias, "delete_many", locked)
+
+
+def invalidate_dependents(cache_alias, cache_key, seen=None, cache_op=None):
+    """Invalidate everything that was computed from `cache_key`,
+    recursively."""
+    cache_op = cache_op or _cache_op
+    if seen is None:
+        seen = set()
+    seen.add((cache_alias, cache_key))
+    key = _dependents_key(cache_key)
+    dependents = cache_op(cache_alias, "get", key)
+    if not dependents:
+        return
+    cache_op(cache_alias, "delete", key)
+    for dependent_alias, dependent_key, name in dependents:
+        if (dependent_alias, dependent_key) in seen:
+            continue
+        with _invalidators_lock:
+            invalidators = list(_invalidators.get(name, ()))
+        if invalidators:
+            for invalidate in invalidators:
+                invalidate(dependent_alias, dependent_key, seen)
+        else:
+            # Not memoized in this process (anymore).
+            cache_op(dependent_alias, "delete", dependent_key)
+            invalidate_dependents(dependent_alias, dependent_key, seen, cache_op)
@@ -0,0 +1,171 @@
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('total_size', 0);
+"""
+
+
+class DiskStore:
+    """A persistent, SQLite backed, store for memoized results.
+
+    Meant as a second tier behind the cache for results that are expensive
+    to compute and should survive cache restarts. The total size of the
+    stored (pickled) values is kept up to date in the database so opening
+    a big store doesn't require scanning it. When the total size exceeds
+    `max_size` bytes, the least recently used entries are deleted.
+
+    Every thread gets its own SQLite connection.
+
+    :arg string path: Path of the SQLite database file.
+    :arg int max_size: Maximum total size, in bytes, of the stored values.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, path, max_size=1024 * 1024 * 1024):
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, default=None):
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            self.delete(key)
+            return default
+        connection.execute(
+            "UPDATE entries SET last_used = ? WHERE key = ?", (now, key)
+        )
+        return pickle.loads(value)
+
+    def set(self, key, value, expires=None):
+        """Store `value`. `expires` is a timestamp, or None for never."""
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        size = len(pickled)
+        if size > self.max_size:
+            return
+        connection = self._connection()
+        with _transaction(connection):
+            row = connection.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, pickled, size, expires, time.time()),
+            )
+            self._add_size(connection, size - (row[0] if row else 0))
+            self._evict(connection)
+
+    def delete(self, key):
+        connection = self._connection()
+        with _transaction(connection):
+            row = connection.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._add_size(connection, -row[0])
+            return True
+
+    def clear(self):
+        connection = self._connection()
+        with _transaction(connection):
+            connection.execute("DELETE FROM entries")
+            connection.execute("UPDATE meta SET value = 0 WHERE name = 'total_size'")
+
+    @property
+    def total_size(self):
+        return self._total_size(self._connection())
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def _total_size(connection):
+        return connection.execute(
+            "SELECT value FROM meta WHERE name = 'total_size'"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _add_size(connection, delta):
+        connection.execute(
+            "UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,)
+        )
+
+    def _evict(self, connection):
+        # Expired entries go first, then the least recently used ones.
+        if self._total_size(connection) <= self.max_size:
+            return
+        now = time.time()
+        freed = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries "
+            "WHERE expires IS NOT NULL AND expires <= ?",
+            (now,),
+        ).fetchone()[0]
+        connection.execute(
+            "DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        )
+        self._add_size(connection, -freed)
+        excess = self._total_size(connection) - self.max_size
+        if excess <= 0:
+            return
+        keys = []
+        freed = 0
+        for key, size in connection.execute(
+            "SELECT key, size FROM entries ORDER BY last_used"
+        ):
+            keys.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        connection.executemany(
+            "DELETE FROM entries WHERE key = ?", [(key,) for key in keys]
+        )
+        self._add_size(connection, -freed)
+
+
+@contextmanager
+def _transaction(connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
@@ -0,0 +1,51 @@
+import pickle
+
+# Largest pickled arguments (and attributes), in bytes, of an exception that's
+# stored as is. Beyond that, only the message is kept, truncated to this.
+MAX_EXCEPTION_SIZE = 1024
+
+
+class CachedException:
+    """What's stored in the cache instead of an exception, with
+    `cache_exceptions`. Unlike the exception itself, it doesn't drag its
+    traceback, `__cause__` and `__context__` along."""
+
+    __slots__ = ("type", "args", "state", "message")
+
+    def __init__(self, type, args, state=None, message=None):
+        self.type = type
+        self.args = args
+        self.state = state
+        self.message = message
+
+    def __getstate__(self):
+        return (self.type, self.args, self.state, self.message)
+
+    def __setstate__(self, state):
+        self.type, self.args, self.state, self.message = state
+
+    @classmethod
+    def pack(cls, exception, max_size=MAX_EXCEPTION_SIZE):
+        args = exception.args
+        state = exception.__dict__ or None
+        try:
+            size = len(pickle.dumps((args, state), pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            size = None
+        if size is not None and size <= max_size:
+            return cls(type(exception), args, state)
+        return cls(type(exception), None, None, str(exception)[:max_size])
+
+    def load(self, default=None):
+        """Return a new exception like the one that was stored, or `default`
+        if it can't be made."""
+        try:
+            if self.args is None:
+                exception = self.type(self.message)
+            else:
+                exception = self.type(*self.args)
+            if self.state:
+                exception.__dict__.update(self.state)
+        except Exception:
+            return default
+        return exception
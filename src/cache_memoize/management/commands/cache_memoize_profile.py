@@ -0,0 +1,62 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.management.base import BaseCommand
+
+from cache_memoize.profiler import collect_profiles
+
+SORT_CHOICES = ("count", "hits", "misses", "compute_time", "size")
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the most used cache keys of memoized functions that use "
+        "`profile=...`, as published to the cache by all processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--alias",
+            default=DEFAULT_CACHE_ALIAS,
+            help="Cache alias the profiles were published to.",
+        )
+        parser.add_argument(
+            "--top", type=int, default=10, help="Number of keys per function."
+        )
+        parser.add_argument("--sort", default="count", choices=SORT_CHOICES)
+        parser.add_argument(
+            "--function", help="Only show functions whose name contains this."
+        )
+
+    def handle(self, *args, **options):
+        profiles = collect_profiles(options["alias"])
+        if not profiles:
+            self.stdout.write("No published profiles found.")
+            return
+        sort = options["sort"]
+        for name in sorted(profiles):
+            if options["function"] and options["function"] not in name:
+                continue
+            profile = profiles[name]
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    "{} ({} samples)".format(name, profile["samples"])
+                )
+            )
+            keys = sorted(
+                profile["keys"], key=lambda s: s[sort] or 0, reverse=True
+            )[: options["top"]]
+            self.stdout.write(
+                "  {:>8} {:>8} {:>8} {:>10} {:>10}  {}".format(
+                    "count", "hits", "misses", "time (s)", "size", "arguments"
+                )
+            )
+            for stats in keys:
+                self.stdout.write(
+                    "  {:>8} {:>8} {:>8} {:>10.3f} {:>10}  {}".format(
+                        stats["count"],
+                        stats["hits"],
+                        stats["misses"],
+                        stats["compute_time"],
+                        "-" if stats["size"] is None else stats["size"],
+                        stats["args"],
+                    )
+                )
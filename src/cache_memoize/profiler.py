@@ -0,0 +1,220 @@
+import logging
+import os
+import pickle
+import threading
+import time
+
+from .utils import get_cache
+
+logger = logging.getLogger("cache_memoize")
+
+# How many distinct keys to keep track of per function.
+PROFILE_CAPACITY = 100
+# Seconds between publishing the profiles of this process to the cache.
+PROFILE_PUBLISH_INTERVAL = 60
+# Cache key of the index of all published profiles.
+PROFILE_INDEX_KEY = "cache_memoize:profiles"
+# Published profiles are forgotten if they're not published again in time.
+PROFILE_PUBLISH_TIMEOUT = 60 * 60 * 24
+ARGS_SUMMARY_LENGTH = 100
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+
+def summarize_args(args, kwargs):
+    summary = ", ".join(
+        [repr(arg) for arg in args]
+        + ["{}={!r}".format(k, v) for k, v in sorted(kwargs.items())]
+    )
+    if len(summary) > ARGS_SUMMARY_LENGTH:
+        summary = summary[: ARGS_SUMMARY_LENGTH - 3] + "..."
+    return summary
+
+
+class KeyStats:
+    __slots__ = (
+        "cache_key",
+        "args",
+        "count",
+        "error",
+        "hits",
+        "misses",
+        "compute_time",
+        "size",
+    )
+
+    def __init__(self, cache_key, args, count=0, error=0):
+        self.cache_key = cache_key
+        self.args = args
+        self.count = count
+        self.error = error
+        self.hits = 0
+        self.misses = 0
+        self.compute_time = 0.0
+        self.size = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FunctionProfile:
+    """The most frequently sampled cache keys of one memoized function.
+
+    Uses the "space-saving" algorithm: at most `capacity` keys are tracked
+    and when a new key is seen, the least frequent key is replaced. The
+    new key inherits its count, which is remembered as the `error` (the
+    maximum overestimate) of the new key's count.
+    """
+
+    def __init__(self, name, capacity=PROFILE_CAPACITY):
+        self.name = name
+        self.capacity = capacity
+        self.samples = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def record(self, cache_key, args, hit, compute_time=None, size=None):
+        with self._lock:
+            self.samples += 1
+            stats = self._keys.get(cache_key)
+            if stats is None:
+                if len(self._keys) < self.capacity:
+                    stats = KeyStats(cache_key, args)
+                else:
+                    evicted = min(self._keys.values(), key=lambda s: s.count)
+                    del self._keys[evicted.cache_key]
+                    stats = KeyStats(
+                        cache_key, args, count=evicted.count, error=evicted.count
+                    )
+                self._keys[cache_key] = stats
+            stats.count += 1
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+                if compute_time is not None:
+                    stats.compute_time += compute_time
+                if size is not None:
+                    stats.size = size
+
+    def top(self, n=10, by="count"):
+        """The `n` keys with the highest `by` (count, hits, misses,
+        compute_time or size)."""
+        with self._lock:
+            stats = [s.as_dict() for s in self._keys.values()]
+        stats.sort(key=lambda s: s[by] or 0, reverse=True)
+        return stats[:n]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "samples": self.samples,
+                "keys": [s.as_dict() for s in self._keys.values()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self.samples = 0
+            self._keys.clear()
+
+
+class Profiler:
+    """Samples the calls of one memoized function into its FunctionProfile
+    and, every now and then, publishes it to the cache."""
+
+    def __init__(self, name, sample_rate, cache_alias, circuit_breaker=None):
+        self.sample_rate = sample_rate
+        self.cache_alias = cache_alias
+        self.circuit_breaker = circuit_breaker
+        with _profiles_lock:
+            self.profile = _profiles.get(name)
+            if self.profile is None:
+                self.profile = _profiles[name] = FunctionProfile(name)
+        self._published = time.monotonic()
+
+    def record(self, cache_key, args, kwargs, hit, compute_time=None, result=None):
+        size = None
+        if not hit:
+            try:
+                size = len(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                pass
+        self.profile.record(
+            cache_key, summarize_args(args, kwargs), hit, compute_time, size
+        )
+        if time.monotonic() - self._published > PROFILE_PUBLISH_INTERVAL:
+            self._published = time.monotonic()
+            try:
+                publish_profiles(self.cache_alias, self.circuit_breaker)
+            except Exception:
+                # The memoized call itself went fine.
+                logger.warning("Publishing the profiles failed", exc_info=True)
+
+
+def get_profiles():
+    """All FunctionProfiles of this process, by function name."""
+    with _profiles_lock:
+        return dict(_profiles)
+
+
+def get_profile(name):
+    with _profiles_lock:
+        return _profiles.get(name)
+
+
+def reset_profiles():
+    with _profiles_lock:
+        for profile in _profiles.values():
+            profile.reset()
+
+
+def _process_id():
+    import socket
+
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+def publish_profiles(cache_alias, circuit_breaker=None):
+    """Store the profiles of this process in the cache so they can be
+    inspected with the `cache_memoize_profile` management command."""
+
+    def cache_op(operation, *args):
+        if circuit_breaker is None:
+            return getattr(get_cache(cache_alias), operation)(*args)
+        return circuit_breaker.call(cache_alias, operation, *args)
+
+    key = "{}:{}".format(PROFILE_INDEX_KEY, _process_id())
+    snapshots = [profile.snapshot() for profile in get_profiles().values()]
+    cache_op("set", key, snapshots, PROFILE_PUBLISH_TIMEOUT)
+    index = cache_op("get", PROFILE_INDEX_KEY) or []
+    if key not in index:
+        cache_op("set", PROFILE_INDEX_KEY, index + [key], PROFILE_PUBLISH_TIMEOUT)
+
+
+def collect_profiles(cache_alias):
+    """Merge the profiles published by all processes into one
+    `{function name: {"samples": int, "keys": [...]}}` dict."""
+    cache = get_cache(cache_alias)
+    index = cache.get(PROFILE_INDEX_KEY) or []
+    published = cache.get_many(index)
+    merged = {}
+    for snapshots in published.values():
+        for snapshot in snapshots:
+            function = merged.setdefault(
+                snapshot["name"], {"samples": 0, "keys": {}}
+            )
+            function["samples"] += snapshot["samples"]
+            for stats in snapshot["keys"]:
+                existing = function["keys"].get(stats["cache_key"])
+                if existing is None:
+                    function["keys"][stats["cache_key"]] = dict(stats)
+                    continue
+                for name in ("count", "error", "hits", "misses", "compute_time"):
+                    existing[name] += stats[name]
+                if stats["size"] is not None:
+                    existing["size"] = stats["size"]
+    for function in merged.values():
+        function["keys"] = list(function["keys"].values())
+    return merged
@@ -0,0 +1,49 @@
+import math
+import random
+
+RANDOM = "random"
+FASTEST = "fastest"
+
+# With "fastest", this fraction of the reads still goes to a random replica
+# so that the latency of the others keeps being measured.
+EXPLORE_RATE = 0.05
+# Weight of the latest read in the moving average of a replica's latency.
+LATENCY_WEIGHT = 0.2
+
+
+class ReplicaSelector:
+    """Picks which of a cache alias and its replicas to read from, either at
+    random or the one that has been the fastest lately."""
+
+    def __init__(self, aliases, strategy=RANDOM):
+        if strategy not in (RANDOM, FASTEST):
+            raise ValueError(
+                "replica_reads must be {!r} or {!r}".format(RANDOM, FASTEST)
+            )
+        self.aliases = tuple(aliases)
+        self.strategy = strategy
+        # Moving average of the seconds a read took, per alias. The ones
+        # never read from yet are 0 so they're tried first.
+        self.latencies = dict.fromkeys(self.aliases, 0.0)
+
+    def choose(self):
+        if self.strategy == RANDOM or random.random() < EXPLORE_RATE:
+            return random.choice(self.aliases)
+        return min(self.latencies, key=self.latencies.get)
+
+    def record(self, alias, seconds):
+        previous = self.latencies[alias]
+        if previous and previous != math.inf:
+            seconds = previous + LATENCY_WEIGHT * (seconds - previous)
+        self.latencies[alias] = seconds
+
+    def record_failure(self, alias):
+        # A read that was skipped or failed. The alias isn't the fastest any
+        # more until a read from it (when exploring) succeeds again.
+        self.latencies[alias] = math.inf
+
+    def order(self):
+        # The aliases to read from until one is available. The chosen one,
+        # then the others with the first one (the cache alias) first.
+        chosen = self.choose()
+        return [chosen] + [alias for alias in self.aliases if alias != chosen]
@@ -0,0 +1,79 @@
+import bisect
+import hashlib
+import threading
+
+# Places on the ring per cache alias. More spread the keys more evenly.
+POINTS_PER_ALIAS = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hash(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class HashRing:
+    """Consistent hashing of cache keys over cache aliases.
+
+    Every alias gets `points` places on a ring and a key belongs to the
+    alias of the first place after its hash. When an alias is added, only
+    the keys that now belong to it (about 1 in n) move; all the others stay
+    where they were.
+    """
+
+    def __init__(self, aliases, points=POINTS_PER_ALIAS):
+        if not aliases:
+            raise ValueError("At least one cache alias is needed")
+        self.aliases = tuple(aliases)
+        ring = sorted(
+            (_hash("{}:{}".format(alias, i)), alias)
+            for alias in self.aliases
+            for i in range(points)
+        )
+        self._hashes = [hash_ for hash_, _ in ring]
+        self._aliases = [alias for _, alias in ring]
+
+    def get(self, cache_key):
+        """Return the cache alias `cache_key` belongs to."""
+        i = bisect.bisect(self._hashes, _hash(cache_key))
+        return self._aliases[i % len(self._aliases)]
+
+    def group(self, cache_keys):
+        """Return the cache keys by the cache alias they belong to."""
+        groups = {}
+        for cache_key in cache_keys:
+            groups.setdefault(self.get(cache_key), []).append(cache_key)
+        return groups
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(
+                max_workers=8, thread_name_prefix="cache_memoize_shards"
+            )
+        return _executor
+
+
+def fan_out(function, groups):
+    """Call `function(alias, items)` for every alias in `groups`, in
+    parallel, and return the results by alias."""
+    if len(groups) < 2:
+        return {alias: function(alias, items) for alias, items in groups.items()}
+    groups = list(groups.items())
+    # The first one runs in this thread, the others in the shared executor.
+    futures = [
+        (alias, _get_executor().submit(function, alias, items))
+        for alias, items in groups[1:]
+    ]
+    alias, items = groups[0]
+    results = {alias: function(alias, items)}
+    for alias, future in futures:
+        results[alias] = future.result()
+    return results
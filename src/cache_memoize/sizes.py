@@ -0,0 +1,121 @@
+import pickle
+import threading
+import zlib
+
+SKIP = "skip"
+COMPRESS = "compress"
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class CompressedValue:
+    """What's stored in the cache instead of a result that was too big."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getstate__(self):
+        return self.data
+
+    def __setstate__(self, state):
+        self.data = state
+
+    def load(self):
+        return pickle.loads(zlib.decompress(self.data))
+
+
+class SizeStats:
+    """Sizes of the (pickled) results one memoized function stored."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stored = 0
+        self.total_size = 0
+        self.max_size = 0
+        self.compressed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def average_size(self):
+        return self.total_size / self.stored if self.stored else 0
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "stored": self.stored,
+                "total_size": self.total_size,
+                "max_size": self.max_size,
+                "average_size": self.average_size,
+                "compressed": self.compressed,
+                "skipped": self.skipped,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.stored = self.total_size = self.max_size = 0
+            self.compressed = self.skipped = 0
+
+
+class SizeLimiter:
+    """Measures results before they're stored and, if they're bigger than
+    `max_item_size`, either doesn't store them or stores them compressed."""
+
+    def __init__(self, name, max_item_size=None, oversize=SKIP):
+        if oversize not in (SKIP, COMPRESS):
+            raise ValueError("oversize must be {!r} or {!r}".format(SKIP, COMPRESS))
+        self.max_item_size = max_item_size
+        self.oversize = oversize
+        with _stats_lock:
+            self.stats = _stats.get(name)
+            if self.stats is None:
+                self.stats = _stats[name] = SizeStats(name)
+
+    def prepare(self, value, skip):
+        """Return what to store instead of `value`, or `skip`."""
+        try:
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Let the cache backend deal with it, as usual.
+            return value
+        size = len(pickled)
+        if self.max_item_size is not None and size > self.max_item_size:
+            if self.oversize == COMPRESS:
+                compressed = zlib.compress(pickled)
+                if len(compressed) <= self.max_item_size:
+                    self._add(len(compressed), compressed=True)
+                    return CompressedValue(compressed)
+            self._add(None)
+            return skip
+        self._add(size)
+        return value
+
+    def _add(self, size, compressed=False):
+        stats = self.stats
+        with stats._lock:
+            if size is None:
+                stats.skipped += 1
+                return
+            stats.stored += 1
+            stats.total_size += size
+            stats.max_size = max(stats.max_size, size)
+            if compressed:
+                stats.compressed += 1
+
+
+def get_size_stats():
+    """The SizeStats of all functions, by function name."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def heaviest_functions(n=10, by="total_size"):
+    """The `n` functions with the highest `by` (total_size, max_size,
+    average_size, stored, compressed or skipped) as dicts."""
+    stats = [s.as_dict() for s in get_size_stats().values()]
+    stats.sort(key=lambda s: s[by], reverse=True)
+    return stats[:n]
@@ -0,0 +1,64 @@
+class StreamManifest:
+    """What's stored, under the cache key, for a memoized generator. The
+    items themselves are stored in `chunks` lists under `chunk_key(...)`."""
+
+    __slots__ = ("chunks", "items")
+
+    def __init__(self, chunks, items):
+        self.chunks = chunks
+        self.items = items
+
+    def __getstate__(self):
+        return (self.chunks, self.items)
+
+    def __setstate__(self, state):
+        self.chunks, self.items = state
+
+    def chunk_keys(self, cache_key):
+        return [chunk_key(cache_key, index) for index in range(self.chunks)]
+
+
+def chunk_key(cache_key, index):
+    return "{}:chunk:{}".format(cache_key, index)
+
+
+def record(iterable, store, cache_key, chunk_size, skip=0):
+    """Yield the items of `iterable` while storing them, `chunk_size` at a
+    time, with `store(key, value)`. Once it's exhausted, the manifest is
+    stored. So if the caller stops iterating early, nothing usable is stored.
+    The first `skip` items are stored but not yielded."""
+    chunks = items = 0
+    buffer = []
+    for item in iterable:
+        buffer.append(item)
+        items += 1
+        if len(buffer) >= chunk_size:
+            store(chunk_key(cache_key, chunks), buffer)
+            chunks += 1
+            buffer = []
+        if items > skip:
+            yield item
+    if buffer:
+        store(chunk_key(cache_key, chunks), buffer)
+        chunks += 1
+    store(cache_key, StreamManifest(chunks, items))
+
+
+def replay(manifest, get_many, cache_key, window, fallback):
+    """Yield the stored items, fetching `window` chunks at a time with
+    `get_many(keys)`. If a chunk is missing (e.g. it was evicted), continue
+    with `fallback(number of items already yielded)` instead."""
+    yielded = 0
+    for start in range(0, manifest.chunks, window):
+        keys = [
+            chunk_key(cache_key, index)
+            for index in range(start, min(start + window, manifest.chunks))
+        ]
+        found = get_many(keys)
+        for key in keys:
+            chunk = found.get(key)
+            if chunk is None:
+                yield from fallback(yielded)
+                return
+            yield from chunk
+            yielded += len(chunk)
@@ -0,0 +1,196 @@
+import hashlib
+from functools import wraps
+
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import cc_delim_re, patch_vary_headers
+from django.utils.http import parse_etags
+
+from . import cache_memoize
+
+BODY_KEY_PREFIX = "cache_memoize:body:"
+
+
+class CachedResponse:
+    """The memoized part of a response. The body is stored separately, by
+    its hash, so a conditional request can be answered without loading it."""
+
+    __slots__ = ("status", "headers", "etag", "content_hash")
+
+    def __init__(self, status, headers, etag, content_hash):
+        self.status = status
+        self.headers = headers
+        self.etag = etag
+        self.content_hash = content_hash
+
+    def __getstate__(self):
+        return (self.status, self.headers, self.etag, self.content_hash)
+
+    def __setstate__(self, state):
+        self.status, self.headers, self.etag, self.content_hash = state
+
+    @property
+    def body_key(self):
+        # Always by the hash of the content, not by the ETag, which views
+        # can set to anything.
+        return BODY_KEY_PREFIX + self.content_hash
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def _names(header):
+    # The lowercased names in a Cache-Control or Vary header.
+    return {
+        part.split("=", 1)[0].strip().lower()
+        for part in cc_delim_re.split(header)
+        if part.strip()
+    }
+
+
+def _is_cacheable(response, vary_on_headers):
+    # A response that varies on anything the cache key doesn't (e.g. on the
+    # Cookie header with `vary_on_cookie`) could be served to the wrong user.
+    vary = _names(response.get("Vary", "")) - _names(",".join(vary_on_headers))
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not _names(response.get("Cache-Control", "")) & {"no-store", "private"}
+        and not vary
+    )
+
+
+def _etag_matches(request, etag):
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if "*" in etags:
+        return True
+    # The weak comparison, as for If-None-Match.
+    etag = etag.removeprefix("W/")
+    return any(e.removeprefix("W/") == etag for e in etags)
+
+
+def cache_memoize_view(
+    timeout=DEFAULT_TIMEOUT,
+    prefix=None,
+    vary_on_headers=(),
+    vary_on_user=(),
+    cache_alias=DEFAULT_CACHE_ALIAS,
+    **options,
+):
+    """Decorator for memoizing (GET and HEAD) views.
+
+    What's stored is the status, the headers and a hash of the content of
+    the response, with the content itself stored separately by that hash.
+    The hash is also the response's ETag so if the request's If-None-Match
+    matches it, a 304 Not Modified is returned without loading the content.
+
+    Only 200 OK responses, without cookies, that aren't streaming responses,
+    private or varying on other headers than `vary_on_headers` are memoized.
+
+    :arg int timeout: Number of seconds to store the response.
+    :arg string prefix: If None becomes the view function name.
+    :arg vary_on_headers: Names of request headers the response varies on.
+    :arg vary_on_user: Names of attributes of `request.user` the response
+    varies on, e.g. ('pk',) or ('is_staff',).
+    :arg string cache_alias: The cache alias to use; defaults to 'default'.
+    Or a list of cache aliases to spread the cache keys over.
+
+    Any other keyword arguments are passed on to `cache_memoize`.
+
+    Usage::
+
+        @cache_memoize_view(60, vary_on_headers=("Accept-Language",))
+        def homepage(request):
+            return render(request, "home.html", {...})
+    """
+
+    def args_rewrite(request, _holder, *args, **kwargs):
+        key = [request.build_absolute_uri()]
+        key.extend(request.headers.get(name, "") for name in vary_on_headers)
+        if vary_on_user:
+            user = getattr(request, "user", None)
+            key.extend(str(getattr(user, name, None)) for name in vary_on_user)
+        key.extend(args)
+        return key
+
+    def decorator(view):
+        def render(request, _holder, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                # A TemplateResponse, which is otherwise only rendered after
+                # the view returns. Its post-render callbacks can replace it.
+                response = response.render()
+            if not _is_cacheable(response, vary_on_headers):
+                raise _Uncacheable(response)
+            content = response.content
+            content_hash = hashlib.md5(content).hexdigest()
+            if not response.has_header("ETag"):
+                response["ETag"] = '"{}"'.format(content_hash)
+            cached = CachedResponse(
+                response.status_code,
+                list(response.items()),
+                response["ETag"],
+                content_hash,
+            )
+            # Stored like the memoized results are: in the same cache alias
+            # (or shard, or replicas) and through the circuit breaker.
+            memoized._cache_set(cached.body_key, content)
+            _holder.append(response)
+            return cached
+
+        # So the default prefix is that of the view.
+        render.__module__ = view.__module__
+        render.__qualname__ = view.__qualname__
+        memoized = cache_memoize(
+            timeout,
+            prefix=prefix,
+            args_rewrite=args_rewrite,
+            cache_alias=cache_alias,
+            **options,
+        )(render)
+
+        def respond(request, args, kwargs):
+            holder = []
+            try:
+                cached = memoized(request, holder, *args, **kwargs)
+                if _etag_matches(request, cached.etag):
+                    response = HttpResponseNotModified()
+                    response["ETag"] = cached.etag
+                    return response
+                if holder:
+                    # It was just rendered.
+                    return holder[0]
+                content = memoized._cache_get(cached.body_key)
+                if content is None:
+                    # The content was evicted, render it again.
+                    memoized(request, holder, *args, _refresh=True, **kwargs)
+                    return holder[0]
+            except _Uncacheable as exception:
+                return exception.response
+            response = HttpResponse(content, status=cached.status)
+            for header, value in cached.headers:
+                response[header] = value
+            return response
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            response = respond(request, args, kwargs)
+            if vary_on_headers:
+                patch_vary_headers(response, vary_on_headers)
+            if vary_on_user:
+                patch_vary_headers(response, ("Cookie",))
+            return response
+
+        def invalidate(request, *args, **kwargs):
+            memoized.invalidate(request, None, *args, **kwargs)
+
+        inner.invalidate = invalidate
+        return inner
+
+    return decorator
@@ -0,0 +1,143 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+
+from .utils import get_cache
+
+logger = logging.getLogger("cache_memoize")
+
+_default_writer = None
+_default_writer_lock = threading.Lock()
+# All writers, to reset them in a forked child process.
+_writers = weakref.WeakSet()
+
+
+class BackgroundWriter:
+    """Writes to the cache in background threads.
+
+    Writes are queued, keyed by cache alias and cache key, so if the same
+    key is written again before the first write happened, only the latest
+    value is written. When `max_pending` writes are already queued, new
+    writes are dropped (the next call will simply be a cache miss again).
+
+    :arg int max_pending: Maximum number of queued writes.
+    :arg int workers: Number of background threads.
+    """
+
+    def __init__(self, max_pending=1000, workers=1):
+        self.max_pending = max_pending
+        self.workers = workers
+        self.dropped = 0
+        self._reset()
+        _writers.add(self)
+
+    def _reset(self):
+        self._pending = OrderedDict()
+        # The (cache alias, cache key) of the writes being made.
+        self._in_flight = Counter()
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def _start(self):
+        # Called with the condition held.
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name="cache_memoize_writer", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, cache_alias, cache_key, value, timeout, circuit_breaker=None):
+        """Queue a write. Returns False if it was dropped."""
+        with self._condition:
+            key = (cache_alias, cache_key)
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending[key] = (value, timeout, circuit_breaker)
+            # Also restarts the threads if they're gone.
+            self._start()
+            self._condition.notify()
+            return True
+
+    def discard(self, cache_alias, cache_key):
+        """Forget a queued write, if there is one. If it's being written
+        already, wait until it's done so that it can be deleted after."""
+        key = (cache_alias, cache_key)
+        with self._condition:
+            self._pending.pop(key, None)
+            while key in self._in_flight:
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, item = self._pending.popitem(last=False)
+                self._in_flight[key] += 1
+            cache_alias, cache_key = key
+            value, timeout, circuit_breaker = item
+            try:
+                if circuit_breaker is None:
+                    get_cache(cache_alias).set(cache_key, value, timeout)
+                else:
+                    circuit_breaker.call(cache_alias, "set", cache_key, value, timeout)
+            except Exception:
+                logger.exception("Background cache write failed")
+            finally:
+                with self._condition:
+                    self._in_flight[key] -= 1
+                    if not self._in_flight[key]:
+                        del self._in_flight[key]
+                    self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until all queued writes are written. Returns False if that
+        didn't happen within `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+            return True
+
+
+def get_writer():
+    """Return the BackgroundWriter used with `async_write=True`."""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = BackgroundWriter()
+        return _default_writer
+
+
+def flush_writes(timeout=None):
+    """Wait for the queued writes of the shared BackgroundWriter."""
+    return get_writer().flush(timeout)
+
+
+def _reset_after_fork():
+    # The threads (and whatever they were writing) stay in the parent process
+    # and the condition may have been held by one of them when it forked. The
+    # queued writes are the parent's to write.
+    for writer in list(_writers):
+        writer._reset()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@atexit.register
+def _flush_on_exit():
+    if _default_writer is not None:
+        _default_writer.flush(timeout=5)
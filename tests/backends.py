@@ -1,7 +1,14 @@
-from collections import OrderedDict
+import pickle
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
 from threading import Lock
 
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.cache.backends.locmem import LocMemCache
+from django.test import override_settings
 
 
 class ThreadLocalCache(LocMemCache):
@@ -19,3 +26,141 @@ class ThreadLocalCache(LocMemCache):
         # NB: This is not calling LocMemCache.__init__
         # - it skips to its parent instead
         super(LocMemCache, self).__init__({})
+
+
+class SimulatedBackendError(ConnectionError):
+    """What a SimulatedNetworkCache raises when a round-trip "fails"."""
+
+
+# Round-trip counters, shared by all SimulatedNetworkCache instances
+# (one per thread) with the same LOCATION.
+_calls = {}
+_calls_locks = {}
+
+
+class SimulatedNetworkCache(LocMemCache):
+    """
+    A stand-in for Memcached/Redis that behaves like a remote cache.
+
+    Like LocMemCache, all threads share the same storage (per LOCATION).
+
+    Every public operation counts as one round-trip which can be configured,
+    with `OPTIONS`, to be slow or to fail:
+
+    * ``LATENCY``: Seconds every round-trip takes (default 0).
+    * ``JITTER``: Random extra seconds, up to this, added to the latency.
+    * ``FAILURE_RATE``: Probability (0-1) that a round-trip raises
+      ``SimulatedBackendError``.
+    * ``MAX_ITEM_SIZE``: Largest pickled value, in bytes, that gets stored.
+      Like Memcached, setting a larger value silently doesn't store it.
+    * ``MAX_ENTRIES`` and ``CULL_FREQUENCY``: Eviction, same as LocMemCache.
+
+    The number of round-trips per operation is kept in ``self.calls``.
+    """
+
+    def __init__(self, name, params):
+        name = name or "simulated"
+        super().__init__(name, params)
+        options = params.get("OPTIONS", {})
+        self.latency = float(options.get("LATENCY", 0))
+        self.jitter = float(options.get("JITTER", 0))
+        self.failure_rate = float(options.get("FAILURE_RATE", 0))
+        self.max_item_size = options.get("MAX_ITEM_SIZE")
+        self.calls = _calls.setdefault(name, Counter())
+        self._calls_lock = _calls_locks.setdefault(name, Lock())
+        # Operations like get_many() are implemented with get() by the base
+        # class. Only the outermost call is a round-trip.
+        self._depth = threading.local()
+
+    def reset_calls(self):
+        with self._calls_lock:
+            self.calls.clear()
+
+    def _round_trip(self, operation, method, *args, **kwargs):
+        depth = getattr(self._depth, "value", 0)
+        if depth:
+            return method(*args, **kwargs)
+        with self._calls_lock:
+            self.calls[operation] += 1
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise SimulatedBackendError(f"Simulated failure in {operation}")
+        self._depth.value = depth + 1
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._depth.value = depth
+
+    def _too_big(self, value):
+        if self.max_item_size is None:
+            return False
+        return len(pickle.dumps(value, self.pickle_protocol)) > self.max_item_size
+
+    def _set_unless_too_big(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._too_big(value):
+            super().delete(key, version=version)
+            return False
+        super().set(key, value, timeout=timeout, version=version)
+        return True
+
+    def _add_unless_too_big(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._too_big(value):
+            return False
+        return super().add(key, value, timeout=timeout, version=version)
+
+    def _set_many_unless_too_big(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = []
+        for key, value in data.items():
+            if not self._set_unless_too_big(key, value, timeout, version):
+                failed.append(key)
+        return failed
+
+    def get(self, *args, **kwargs):
+        return self._round_trip("get", super().get, *args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self._round_trip("set", self._set_unless_too_big, *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        return self._round_trip("add", self._add_unless_too_big, *args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        return self._round_trip("touch", super().touch, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._round_trip("delete", super().delete, *args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        return self._round_trip("incr", super().incr, *args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        return self._round_trip("has_key", super().has_key, *args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        return self._round_trip("get_many", super().get_many, *args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self._round_trip(
+            "set_many", self._set_many_unless_too_big, *args, **kwargs
+        )
+
+    def delete_many(self, *args, **kwargs):
+        return self._round_trip("delete_many", super().delete_many, *args, **kwargs)
+
+
+def simulated(**options):
+    """Override the "simulated" cache alias with these `OPTIONS`, e.g.
+    ``with simulated(LATENCY=0.01): ...``."""
+    return override_settings(
+        CACHES={
+            **settings.CACHES,
+            "simulated": {
+                "BACKEND": "tests.backends.SimulatedNetworkCache",
+                "OPTIONS": options,
+            },
+        }
+    )
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the per-call overhead of the decorator.
+
+Run it with::
+
+    python -m tests.benchmark
+
+Every case is a memoized function called with arguments that are already in
+the cache (a hit), so what's measured is the time spent in the decorator,
+the key generation and the (LocMemCache) cache lookup. ``raw cache.get`` is
+the cost of the cache lookup alone.
+"""
+
+import argparse
+import timeit
+
+import django
+from django.conf import settings
+
+
+def configure():
+    if not settings.configured:
+        settings.configure(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "benchmark",
+                }
+            }
+        )
+        django.setup()
+
+
+def cases():
+    from django.core.cache import caches
+
+    from cache_memoize import cache_memoize
+
+    @cache_memoize(100)
+    def plain(a, b):
+        return a + b
+
+    @cache_memoize(100, args_rewrite=lambda a, b: (a,))
+    def rewrite(a, b):
+        return a + b
+
+    @cache_memoize(100, extra={"version": 2})
+    def extra(a, b):
+        return a + b
+
+    @cache_memoize(100, hit_callable=lambda *a: None, miss_callable=lambda *a: None)
+    def callbacks(a, b):
+        return a + b
+
+    @cache_memoize(100)
+    def keywords(a, b=0):
+        return a + b
+
+    cache = caches["default"]
+    key = plain.get_cache_key(1, 2)
+    for function in (plain, rewrite, extra, callbacks):
+        function(1, 2)
+    keywords(1, b=2)
+
+    return [
+        ("raw cache.get", lambda: cache.get(key)),
+        ("plain", lambda: plain(1, 2)),
+        ("args_rewrite", lambda: rewrite(1, 2)),
+        ("extra", lambda: extra(1, 2)),
+        ("callbacks", lambda: callbacks(1, 2)),
+        ("keyword arguments", lambda: keywords(1, b=2)),
+        ("get_cache_key", lambda: plain.get_cache_key(1, 2)),
+    ]
+
+
+def run(number=100000, repeat=5):
+    configure()
+    results = []
+    for name, function in cases():
+        best = min(timeit.repeat(function, number=number, repeat=repeat))
+        results.append((name, best / number))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    for name, seconds in run(args.number, args.repeat):
+        print("{:<20} {:>8.2f}us".format(name, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,7 @@ def clear_cache():
     caches["default"].clear()
     caches["other"].clear()
     caches["thread_local"].clear()
+    caches["simulated"].clear()
+    caches["simulated"].reset_calls()
+    caches["simulated_other"].clear()
+    caches["simulated_other"].reset_calls()
@@ -0,0 +1,227 @@
+"""
+Load test memoized functions against a simulated network cache.
+
+Run it with, for example::
+
+    python -m tests.loadtest --threads 32 --requests 5000 --latency 0.001
+
+Every worker calls a memoized function with arguments drawn from a skewed
+(Zipf-like) distribution, so a few keys are hot and most are cold, against
+a ``tests.backends.SimulatedNetworkCache``. The report has the throughput,
+the number of cache backend round-trips per request and the latency
+percentiles.
+
+With ``--processes`` the workload is split over several processes. Note that
+each process then has its own simulated backend, like separate hosts each
+talking to their own cache node would.
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+ALIAS = "loadtest"
+
+
+def configure(latency=0.0, jitter=0.0, failure_rate=0.0, max_entries=300):
+    if not settings.configured:
+        settings.configure(CACHES={})
+        django.setup()
+    from django.core.cache import caches
+
+    caches.settings[ALIAS] = {
+        "BACKEND": "tests.backends.SimulatedNetworkCache",
+        "OPTIONS": {
+            "LATENCY": latency,
+            "JITTER": jitter,
+            "FAILURE_RATE": failure_rate,
+            "MAX_ENTRIES": max_entries,
+        },
+    }
+    # Forget any previously created backend for the alias.
+    try:
+        del caches[ALIAS]
+    except AttributeError:
+        pass
+
+
+def make_workload(compute_time, decorator_options):
+    from cache_memoize import cache_memoize
+
+    @cache_memoize(60, cache_alias=ALIAS, **decorator_options)
+    def expensive(n):
+        if compute_time:
+            time.sleep(compute_time)
+        return n * 2
+
+    return expensive
+
+
+def zipf_keys(count, distinct, skew, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank**skew) for rank in range(1, distinct + 1)]
+    return rng.choices(range(distinct), weights=weights, k=count)
+
+
+def run(
+    threads=8,
+    requests=1000,
+    distinct=1000,
+    skew=1.1,
+    compute_time=0.0,
+    latency=0.0,
+    jitter=0.0,
+    failure_rate=0.0,
+    max_entries=300,
+    seed=0,
+    decorator_options=None,
+):
+    """Run the load test in this process and return the measurements."""
+    configure(latency, jitter, failure_rate, max_entries)
+    from django.core.cache import caches
+
+    backend = caches[ALIAS]
+    backend.clear()
+    backend.reset_calls()
+    expensive = make_workload(compute_time, decorator_options or {})
+    keys = zipf_keys(requests, distinct, skew, seed)
+    chunks = [keys[i::threads] for i in range(threads)]
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def worker(chunk):
+        timings = []
+        failed = Counter()
+        for key in chunk:
+            t0 = time.perf_counter()
+            try:
+                expensive(key)
+            except Exception as exception:
+                failed[type(exception).__name__] += 1
+            timings.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(timings)
+            errors.update(failed)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    t0 = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "calls": Counter(backend.calls),
+        "errors": errors,
+    }
+
+
+def _run_in_process(kwargs):
+    return run(**kwargs)
+
+
+def run_processes(processes, **kwargs):
+    per_process = kwargs.pop("requests") // processes
+    jobs = [
+        dict(kwargs, requests=per_process, seed=kwargs.get("seed", 0) + i)
+        for i in range(processes)
+    ]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(processes) as executor:
+        results = list(executor.map(_run_in_process, jobs))
+    combined = {
+        "requests": per_process * processes,
+        "elapsed": time.perf_counter() - t0,
+        "latencies": [],
+        "calls": Counter(),
+        "errors": Counter(),
+    }
+    for result in results:
+        combined["latencies"].extend(result["latencies"])
+        combined["calls"].update(result["calls"])
+        combined["errors"].update(result["errors"])
+    return combined
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(result):
+    requests = result["requests"]
+    latencies = result["latencies"]
+    lines = [
+        "Requests:          {}".format(requests),
+        "Elapsed:           {:.3f}s".format(result["elapsed"]),
+        "Throughput:        {:.1f} req/s".format(requests / result["elapsed"]),
+        "Backend calls/req: {:.3f}".format(sum(result["calls"].values()) / requests),
+    ]
+    for operation, count in sorted(result["calls"].items()):
+        lines.append("  {:<16} {:.3f}".format(operation + ":", count / requests))
+    lines.extend(
+        [
+            "Latency mean:      {:.3f}ms".format(statistics.mean(latencies) * 1000),
+            "Latency p50:       {:.3f}ms".format(percentile(latencies, 0.5) * 1000),
+            "Latency p95:       {:.3f}ms".format(percentile(latencies, 0.95) * 1000),
+            "Latency p99:       {:.3f}ms".format(percentile(latencies, 0.99) * 1000),
+            "Latency max:       {:.3f}ms".format(max(latencies) * 1000),
+        ]
+    )
+    for name, count in sorted(result["errors"].items()):
+        lines.append("Errors ({}): {}".format(name, count))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--distinct", type=int, default=1000, help="Distinct keys")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument(
+        "--compute-time", type=float, default=0.001, help="Seconds per miss"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0005, help="Seconds per round-trip"
+    )
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--max-entries", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    kwargs = dict(
+        threads=args.threads,
+        requests=args.requests,
+        distinct=args.distinct,
+        skew=args.skew,
+        compute_time=args.compute_time,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        max_entries=args.max_entries,
+    )
+    if args.processes > 1:
+        result = run_processes(args.processes, **kwargs)
+    else:
+        result = run(**kwargs)
+    print(report(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "cache_memoize",
 ]
 
 MIDDLEWARE = [
@@ -58,4 +59,9 @@ CACHES = {
         "LOCATION": "other-anything",
     },
     "thread_local": {"BACKEND": "tests.backends.ThreadLocalCache"},
+    "simulated": {"BACKEND": "tests.backends.SimulatedNetworkCache"},
+    "simulated_other": {
+        "BACKEND": "tests.backends.SimulatedNetworkCache",
+        "LOCATION": "simulated_other",
+    },
 }
@@ -0,0 +1,85 @@
+import time
+
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize, get_adaptive_policies
+from cache_memoize.adaptive import BYPASS, CACHE, SAMPLE, AdaptivePolicy
+
+
+def test_adaptive_bypass_when_never_hit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    calls_made = []
+
+    @cache_memoize(10, adaptive={"window": 20, "bypass_period": 60})
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    policy = runmeonce.adaptive
+    assert get_adaptive_policies()[policy.name] is policy
+    for i in range(20):
+        runmeonce(i)
+    assert policy.mode == BYPASS
+    assert policy.decisions[-1][1:3] == (CACHE, BYPASS)
+
+    backend = caches["default"]
+    key = runmeonce.get_cache_key(100)
+    runmeonce(100)
+    runmeonce(100)
+    assert calls_made[-2:] == [100, 100]
+    assert backend.get(key) is None
+
+    # After the bypass period, caching is re-evaluated.
+    now[0] += 60
+    calls_made.clear()
+    runmeonce(100)
+    runmeonce(100)
+    assert calls_made == [100]
+    assert policy.mode == CACHE
+    assert backend.get(key) == 100
+
+
+def test_adaptive_keeps_caching_when_worth_it():
+    calls_made = []
+
+    @cache_memoize(10, adaptive={"window": 20})
+    def runmeonce(a):
+        calls_made.append(a)
+        time.sleep(0.01)
+        return a
+
+    for i in range(40):
+        runmeonce(i % 2)
+    assert runmeonce.adaptive.mode == CACHE
+    assert len(calls_made) == 2
+
+
+def test_adaptive_policy_sample_mode(monkeypatch):
+    monkeypatch.setattr("random.random", lambda: 0.5)
+    policy = AdaptivePolicy("test", window=10, min_hit_ratio=0.2, sample_rate=0.1)
+    # Half hits, but computing is cheaper than the cache.
+    for i in range(10):
+        policy.record(i % 2 == 0, cache_time=0.002, compute_time=0.001)
+    assert policy.mode == SAMPLE
+    assert not policy.should_store()
+    # Still not worth it.
+    for i in range(10):
+        policy.record(i % 2 == 0, cache_time=0.002, compute_time=0.001)
+    assert policy.mode == BYPASS
+    assert [d[1:3] for d in policy.decisions] == [(CACHE, SAMPLE), (SAMPLE, BYPASS)]
+    policy.reset()
+    assert policy.mode == CACHE
+    assert policy.should_store()
+
+
+def test_adaptive_policy_sample_mode_recovers():
+    policy = AdaptivePolicy("test", window=10, min_hit_ratio=0.2)
+    for i in range(10):
+        policy.record(i % 2 == 0, cache_time=0.002, compute_time=0.001)
+    assert policy.mode == SAMPLE
+    # Caching pays off again: 90% hits and slow to compute.
+    for i in range(10):
+        policy.record(i != 0, cache_time=0.002, compute_time=1.0)
+    assert policy.mode == CACHE
+    assert [d[1:3] for d in policy.decisions] == [(CACHE, SAMPLE), (SAMPLE, CACHE)]
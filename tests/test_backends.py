@@ -0,0 +1,75 @@
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize
+
+from . import loadtest
+from .backends import SimulatedBackendError, simulated
+
+
+def test_simulated_cache_counts_round_trips():
+    calls_made = []
+
+    @cache_memoize(10, cache_alias="simulated")
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    runmeonce(1)
+    runmeonce(1)
+    runmeonce(2)
+    assert len(calls_made) == 2
+    backend = caches["simulated"]
+    assert backend.calls == {"get": 3, "set": 2}
+    # Bulk operations are a single round-trip.
+    backend.get_many(["a", "b", "c"])
+    backend.set_many({"a": 1, "b": 2})
+    assert backend.calls["get_many"] == 1
+    assert backend.calls["set_many"] == 1
+    assert backend.calls["get"] == 3
+    assert backend.calls["set"] == 2
+
+
+def test_simulated_cache_max_item_size():
+    with simulated(MAX_ITEM_SIZE=100):
+        backend = caches["simulated"]
+        backend.set("small", "x")
+        backend.set("big", "x" * 1000)
+        assert backend.get("small") == "x"
+        assert backend.get("big") is None
+        assert backend.set_many({"small": "y", "big": "y" * 1000}) == ["big"]
+        assert backend.get("small") == "y"
+
+
+def test_simulated_cache_eviction():
+    with simulated(MAX_ENTRIES=10, CULL_FREQUENCY=2):
+        backend = caches["simulated"]
+        for i in range(20):
+            backend.set(i, i)
+        assert sum(backend.get(i) is not None for i in range(20)) <= 10
+        assert backend.get(19) == 19
+
+
+def test_simulated_cache_failures():
+    with simulated(FAILURE_RATE=1):
+        with pytest.raises(SimulatedBackendError):
+            caches["simulated"].get("anything")
+
+
+def test_simulated_cache_latency():
+    result = loadtest.run(threads=1, requests=5, distinct=1, latency=0.01)
+    # One get per request, one set for the single miss.
+    assert result["calls"] == {"get": 5, "set": 1}
+    assert min(result["latencies"]) >= 0.01
+
+
+def test_loadtest_report():
+    result = loadtest.run(threads=4, requests=200, distinct=20)
+    assert result["requests"] == 200
+    assert len(result["latencies"]) == 200
+    assert result["calls"]["get"] == 200
+    assert result["calls"]["set"] <= 20 * 4
+    output = loadtest.report(result)
+    assert "Throughput:" in output
+    assert "Backend calls/req:" in output
+    assert "Latency p99:" in output
@@ -0,0 +1,149 @@
+import time
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import CircuitBreaker, cache_memoize, get_circuit_breaker
+from cache_memoize.breaker import CLOSED, HALF_OPEN, OPEN
+
+from .backends import simulated
+
+
+def test_circuit_breaker_bypasses_failing_backend():
+    calls_made = []
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=breaker)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    with simulated(FAILURE_RATE=1):
+        # The failing get counts as a miss and the failing set is ignored.
+        assert runmeonce(1) == 2
+        assert breaker.state == OPEN
+        backend = caches["simulated"]
+        backend.reset_calls()
+        assert runmeonce(1) == 2
+        assert runmeonce(1) == 2
+        # The open breaker doesn't even try to talk to the backend.
+        assert backend.calls == {}
+    assert len(calls_made) == 3
+
+
+def test_circuit_breaker_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    calls_made = []
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=breaker)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    with simulated(FAILURE_RATE=1):
+        runmeonce(1)
+        assert breaker.state == OPEN
+        now[0] += 30
+        assert breaker.state == HALF_OPEN
+        # The probe fails so it's open again.
+        runmeonce(1)
+        assert breaker.state == OPEN
+
+    now[0] += 30
+    runmeonce(1)
+    assert breaker.state == CLOSED
+    runmeonce(1)
+    runmeonce(1)
+    assert len(calls_made) == 3
+
+
+def test_circuit_breaker_operation_timeout():
+    calls_made = []
+    breaker = CircuitBreaker(failure_threshold=1, operation_timeout=0.01)
+
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=breaker)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    with simulated(LATENCY=0.2):
+        t0 = time.monotonic()
+        assert runmeonce(1) == 2
+        # Neither the get nor the set waited for the slow backend.
+        assert time.monotonic() - t0 < 0.2
+        assert breaker.state == OPEN
+    assert len(calls_made) == 1
+
+
+def test_circuit_breaker_slow_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, slow_threshold=0.01)
+
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=breaker)
+    def runmeonce(a):
+        return a * 2
+
+    with simulated(LATENCY=0.02):
+        runmeonce(1)
+    assert breaker.state == OPEN
+
+
+def test_circuit_breaker_invalidate_while_open():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=breaker)
+    def runmeonce(a):
+        return a * 2
+
+    with simulated(FAILURE_RATE=1):
+        runmeonce(1)
+        runmeonce.invalidate(1)
+        assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize("alias", ["default", "other"])
+def test_shared_circuit_breaker_per_alias(alias):
+    @cache_memoize(10, cache_alias=alias, circuit_breaker=True)
+    def runmeonce(a):
+        return a * 2
+
+    breaker = get_circuit_breaker(alias)
+    assert breaker is get_circuit_breaker(alias)
+    assert breaker is not get_circuit_breaker("thread_local")
+    assert runmeonce(1) == 2
+    assert breaker.state == CLOSED
+
+
+def test_circuit_breaker_once_per_fails_open():
+    calls_made = []
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+
+    @cache_memoize(once_per=10, cache_alias="simulated", circuit_breaker=breaker)
+    def send_email(to):
+        calls_made.append(to)
+        return "sent"
+
+    with simulated(FAILURE_RATE=1):
+        # Without the cache to count them, the calls aren't limited.
+        assert send_email("peter") == "sent"
+        assert breaker.state == OPEN
+        assert send_email("peter") == "sent"
+    assert calls_made == ["peter", "peter"]
+
+
+def test_circuit_breaker_once_per_expired_counter(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    @cache_memoize(
+        once_per=10, max_calls=2, cache_alias="simulated", circuit_breaker=breaker
+    )
+    def send_email(to):
+        return "sent"
+
+    # The counter expires between the `add` and the `incr`, which raises
+    # `ValueError`. That's not a failure of the backend.
+    monkeypatch.setattr(caches["simulated"], "add", lambda *args: False)
+    assert send_email("peter") is None
+    assert breaker.state == CLOSED
+    assert breaker._failures == 0
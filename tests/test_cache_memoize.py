@@ -3,6 +3,7 @@ from threading import Thread, Lock
 
 import pytest
 from django.core.cache import cache
+from django.test import override_settings
 
 from cache_memoize import cache_memoize
 
@@ -543,3 +544,90 @@ def test_dont_cache_unrelated_exceptions():
     with pytest.raises(SecondTestException):
         raise_test_exception()
     assert len(calls_made) == 2
+
+
+def test_sliding_expiration(monkeypatch):
+    calls_made = []
+    touches = []
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    monkeypatch.setattr(
+        cache, "touch", lambda key, timeout: touches.append((key, timeout))
+    )
+
+    @cache_memoize(100, sliding=True)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    assert runmeonce(10) == 20
+    assert len(calls_made) == 1
+    # The set just happened, no need to touch yet.
+    assert runmeonce(10) == 20
+    assert touches == []
+
+    now[0] += 30
+    assert runmeonce(10) == 20
+    assert touches == [(runmeonce.get_cache_key(10), 100)]
+    # Rate limited until another quarter of the timeout has passed.
+    runmeonce(10)
+    runmeonce(10)
+    assert len(touches) == 1
+    now[0] += 30
+    runmeonce(10)
+    assert len(touches) == 2
+    assert len(calls_made) == 1
+
+
+def test_sliding_expiration_without_timeout(monkeypatch):
+    touches = []
+    monkeypatch.setattr(
+        cache, "touch", lambda key, timeout: touches.append((key, timeout))
+    )
+
+    @cache_memoize(None, sliding=True)
+    def runmeonce(a):
+        return a * 2
+
+    runmeonce(10)
+    runmeonce(10)
+    assert touches == []
+
+
+def test_extra_and_args_rewrite_get_the_original_arguments():
+    seen = []
+
+    def extra(*args):
+        seen.append(args)
+        return args
+
+    @cache_memoize(10, args_rewrite=lambda a, b: (a,), extra=extra)
+    def runmeonce(a, b):
+        return a + b
+
+    runmeonce(1, 2)
+    assert seen == [(1, 2)]
+
+
+def test_cache_backend_follows_settings_changes():
+    calls_made = []
+
+    @cache_memoize(10)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    runmeonce(1)
+    assert len(calls_made) == 1
+    with override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "elsewhere",
+            }
+        }
+    ):
+        runmeonce(1)
+        assert len(calls_made) == 2
+    runmeonce(1)
+    assert len(calls_made) == 2
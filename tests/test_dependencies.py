@@ -0,0 +1,229 @@
+import threading
+
+from django.core.cache import caches
+
+from cache_memoize import BackgroundWriter, CircuitBreaker, cache_memoize
+
+from .backends import simulated
+
+
+def test_invalidate_cascades_to_dependents():
+    calls_made = []
+
+    @cache_memoize(10)
+    def get_name(user_id):
+        calls_made.append(("get_name", user_id))
+        return "name{}".format(user_id)
+
+    @cache_memoize(10, cache_alias="other")
+    def get_email(user_id):
+        calls_made.append(("get_email", user_id))
+        return "user{}@example.com".format(user_id)
+
+    @cache_memoize(100, track_dependencies=True)
+    def render(user_id):
+        calls_made.append(("render", user_id))
+        return "{} <{}>".format(get_name(user_id), get_email(user_id))
+
+    @cache_memoize(100, track_dependencies=True)
+    def page(user_id):
+        calls_made.append(("page", user_id))
+        return "<p>{}</p>".format(render(user_id))
+
+    assert page(1) == "<p>name1 <user1@example.com></p>"
+    assert page(2)
+    assert len(calls_made) == 8
+    page(1)
+    page(2)
+    assert len(calls_made) == 8
+
+    # Invalidating a dependency invalidates its dependents, recursively,
+    # also across cache aliases.
+    get_email.invalidate(1)
+    calls_made.clear()
+    page(1)
+    assert calls_made == [("page", 1), ("render", 1), ("get_email", 1)]
+    calls_made.clear()
+    page(2)
+    assert calls_made == []
+
+    # Directly invalidating the middle one.
+    render.invalidate(2)
+    page(2)
+    assert calls_made == [("page", 2), ("render", 2)]
+
+
+def test_dependencies_recorded_on_hits():
+    calls_made = []
+
+    @cache_memoize(10)
+    def child(a):
+        return a
+
+    @cache_memoize(10, track_dependencies=True)
+    def parent(a):
+        calls_made.append(a)
+        return child(a) * 2
+
+    child(1)
+    parent(1)
+    child.invalidate(1)
+    parent(1)
+    assert calls_made == [1, 1]
+
+
+def test_untracked_function_not_invalidated():
+    calls_made = []
+
+    @cache_memoize(10)
+    def child(a):
+        return a
+
+    @cache_memoize(10)
+    def parent(a):
+        calls_made.append(a)
+        return child(a) * 2
+
+    parent(1)
+    child.invalidate(1)
+    parent(1)
+    assert calls_made == [1]
+
+
+def test_dependents_expire_with_the_dependent():
+    @cache_memoize(10)
+    def child(a):
+        return a
+
+    @cache_memoize(100, track_dependencies=True)
+    def long_parent(a):
+        return child(a)
+
+    @cache_memoize(None, track_dependencies=True)
+    def forever_parent(a):
+        return child(a)
+
+    long_parent(1)
+    key = "cache_memoize:dependents:" + child.get_cache_key(1)
+    dependents = caches["default"].get(key)
+    name = __name__ + ".test_dependents_expire_with_the_dependent.<locals>."
+    assert list(dependents) == [
+        ("default", long_parent.get_cache_key(1), name + "long_parent")
+    ]
+    forever_parent(1)
+    dependents = caches["default"].get(key)
+    forever_key = ("default", forever_parent.get_cache_key(1), name + "forever_parent")
+    assert dependents[forever_key] is None
+    assert len(dependents) == 2
+
+
+def test_invalidate_cascades_to_persisted_dependents(tmp_path):
+    values = {1: 10}
+
+    @cache_memoize(10)
+    def child(a):
+        return values[a]
+
+    @cache_memoize(100, track_dependencies=True, persist=str(tmp_path / "db"))
+    def parent(a):
+        return child(a) * 2
+
+    assert parent(1) == 20
+    values[1] = 20
+    child.invalidate(1)
+    # Not brought back from disk.
+    assert parent(1) == 40
+
+
+def test_invalidate_cascades_to_queued_writes():
+    writer = BackgroundWriter()
+
+    @cache_memoize(10)
+    def child(a):
+        return a
+
+    @cache_memoize(
+        100, cache_alias="simulated", track_dependencies=True, async_write=writer
+    )
+    def parent(a):
+        return child(a) * 2
+
+    with simulated(LATENCY=0.05):
+        parent(1)
+        parent(2)
+        child.invalidate(2)
+        assert writer.flush(timeout=5)
+        backend = caches["simulated"]
+        assert backend.get(parent.get_cache_key(1)) == 2
+        assert backend.get(parent.get_cache_key(2)) is None
+
+
+def test_dependencies_with_circuit_breaker():
+    @cache_memoize(10, cache_alias="simulated", circuit_breaker=CircuitBreaker())
+    def child(a):
+        return a
+
+    @cache_memoize(
+        10,
+        cache_alias="simulated",
+        track_dependencies=True,
+        circuit_breaker=CircuitBreaker(),
+    )
+    def parent(a):
+        return child(a) * 2
+
+    with simulated(FAILURE_RATE=1):
+        assert parent(1) == 2
+        child.invalidate(1)
+        parent.invalidate(1)
+
+
+def test_dependents_recorded_concurrently():
+    barrier = threading.Barrier(2)
+
+    @cache_memoize(10, cache_alias="simulated")
+    def get_user(user_id):
+        return user_id
+
+    @cache_memoize(100, cache_alias="simulated", track_dependencies=True)
+    def render(user_id, template):
+        user = get_user(user_id)
+        # Both record their dependency on get_user(1) at the same time.
+        barrier.wait()
+        return (user, template)
+
+    get_user(1)
+    with simulated(LATENCY=0.02):
+        threads = [
+            threading.Thread(target=render, args=(1, template))
+            for template in ("a", "b")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        get_user.invalidate(1)
+        backend = caches["simulated"]
+        assert backend.get(render.get_cache_key(1, "a")) is None
+        assert backend.get(render.get_cache_key(1, "b")) is None
+
+
+def test_dependents_recorded_in_one_round_trip():
+    @cache_memoize(10, cache_alias="simulated")
+    def child(a):
+        return a
+
+    @cache_memoize(10, cache_alias="simulated", track_dependencies=True)
+    def parent(a):
+        return child(a) + child(a + 1) + child(a + 2)
+
+    child(1), child(2), child(3)
+    backend = caches["simulated"]
+    backend.reset_calls()
+    parent(1)
+    # The parent's own get and set and the children's gets, plus one
+    # get_many and one set_many for all of the dependents.
+    assert backend.calls["get"] == 4
+    assert backend.calls["set"] == 1
+    assert backend.calls["get_many"] == 1
+    assert backend.calls["set_many"] == 1
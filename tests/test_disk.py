@@ -0,0 +1,115 @@
+from django.core.cache import cache
+
+from cache_memoize import DiskStore, cache_memoize
+
+
+def test_disk_store(tmp_path):
+    store = DiskStore(tmp_path / "store.sqlite")
+    assert store.get("foo") is None
+    store.set("foo", {"bar": 1})
+    assert store.get("foo") == {"bar": 1}
+    store.set("foo", "x" * 100)
+    assert store.get("foo") == "x" * 100
+    assert len(store) == 1
+    assert 100 < store.total_size < 200
+    assert store.delete("foo")
+    assert not store.delete("foo")
+    assert store.total_size == 0
+    store.set("foo", 1)
+    store.clear()
+    assert len(store) == 0
+    assert store.total_size == 0
+
+
+def test_disk_store_expires(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    store = DiskStore(tmp_path / "store.sqlite")
+    store.set("foo", "bar", expires=1010)
+    store.set("forever", "bar")
+    now[0] += 20
+    assert store.get("foo") is None
+    assert store.get("forever") == "bar"
+    assert len(store) == 1
+
+
+def test_disk_store_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    store = DiskStore(tmp_path / "store.sqlite", max_size=3000)
+    for i in range(3):
+        now[0] += 1
+        store.set(i, "x" * 900)
+    now[0] += 1
+    store.get(0)
+    now[0] += 1
+    store.set("new", "x" * 900)
+    assert store.total_size <= 3000
+    # The least recently used went first.
+    assert store.get(1) is None
+    assert store.get(0) is not None
+    assert store.get(2) is not None
+    assert store.get("new") is not None
+    # Too big to ever fit.
+    store.set("huge", "x" * 5000)
+    assert store.get("huge") is None
+
+
+def test_disk_store_reopen(tmp_path):
+    store = DiskStore(tmp_path / "store.sqlite")
+    store.set("foo", "bar")
+    reopened = DiskStore(tmp_path / "store.sqlite")
+    assert reopened.get("foo") == "bar"
+    assert reopened.total_size == store.total_size
+
+
+def test_persist(tmp_path):
+    calls_made = []
+    path = tmp_path / "store.sqlite"
+
+    @cache_memoize(10, persist=path)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    assert runmeonce(1) == 2
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 1
+
+    # The cache is flushed, but the result is still on disk.
+    cache.clear()
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 1
+    assert cache.get(runmeonce.get_cache_key(1)) == 2
+    assert DiskStore(path).get(runmeonce.get_cache_key(1)) == 2
+
+    runmeonce.invalidate(1)
+    assert DiskStore(path).get(runmeonce.get_cache_key(1)) is None
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 2
+
+    runmeonce(1, _refresh=True)
+    assert len(calls_made) == 3
+
+
+def test_persist_relative_backend_timeout(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    # Like Redis and Memcached, whose backend timeouts are seconds from now
+    # rather than timestamps. For LocMemCache that means everything expires
+    # right away, so the results come from the disk.
+    monkeypatch.setattr(cache, "get_backend_timeout", lambda timeout=None: 10)
+    calls_made = []
+
+    @cache_memoize(10, persist=tmp_path / "store.sqlite")
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    assert runmeonce(1) == 2
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 1
+
+    now[0] += 20
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 2
@@ -0,0 +1,137 @@
+import pickle
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize
+from cache_memoize.exceptions import CachedException
+
+
+class LookupFailed(Exception):
+    pass
+
+
+class NeedsTwoArguments(Exception):
+    def __init__(self, code, reason):
+        super().__init__("{}: {}".format(code, reason))
+
+
+def test_cached_exception_is_compact():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=LookupFailed, cache_alias="simulated")
+    def runmeonce(a):
+        calls_made.append(a)
+        try:
+            {}[a]
+        except KeyError as exception:
+            error = LookupFailed("No {}".format(a), a)
+            error.status = 404
+            raise error from exception
+
+    with pytest.raises(LookupFailed) as first:
+        runmeonce(1)
+    assert first.value.__cause__ is not None
+
+    stored = caches["simulated"].get(runmeonce.get_cache_key(1))
+    assert type(stored) is CachedException
+    assert stored.type is LookupFailed
+    assert stored.args == ("No 1", 1)
+    assert stored.state == {"status": 404}
+
+    with pytest.raises(LookupFailed) as second:
+        runmeonce(1)
+    assert second.value.args == ("No 1", 1)
+    assert second.value.status == 404
+    assert second.value.__cause__ is None
+    assert calls_made == [1]
+
+
+def test_exception_that_cant_be_pickled():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=LookupFailed)
+    def runmeonce(a):
+        calls_made.append(a)
+        error = LookupFailed("No {}".format(a))
+        error.retry = lambda: runmeonce(a)
+        raise error
+
+    with pytest.raises(LookupFailed) as exc_info:
+        runmeonce(1)
+    # As is, it couldn't be stored.
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        pickle.dumps(exc_info.value)
+    with pytest.raises(LookupFailed) as exc_info:
+        runmeonce(1)
+    assert exc_info.value.args == ("No 1",)
+    assert calls_made == [1]
+
+
+def test_max_exception_size():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=LookupFailed, max_exception_size=100)
+    def runmeonce(a):
+        calls_made.append(a)
+        raise LookupFailed("x" * a)
+
+    with pytest.raises(LookupFailed):
+        runmeonce(1000)
+    stored = caches["default"].get(runmeonce.get_cache_key(1000))
+    assert stored.args is None
+    assert stored.message == "x" * 100
+
+    with pytest.raises(LookupFailed) as exc_info:
+        runmeonce(1000)
+    assert exc_info.value.args == ("x" * 100,)
+    assert calls_made == [1000]
+
+
+def test_exception_that_cant_be_made_again():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=NeedsTwoArguments)
+    def runmeonce(a):
+        calls_made.append(a)
+        raise NeedsTwoArguments(a, "nope")
+
+    # Its args are the message only, so it can't be made from the cache
+    # and is computed again instead.
+    with pytest.raises(NeedsTwoArguments):
+        runmeonce(1)
+    with pytest.raises(NeedsTwoArguments):
+        runmeonce(1)
+    assert calls_made == [1, 1]
+
+
+def test_raw_exception_in_cache():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=LookupFailed)
+    def runmeonce(a):
+        calls_made.append(a)
+        raise LookupFailed(a)
+
+    # Stored by an earlier version.
+    caches["default"].set(runmeonce.get_cache_key(1), LookupFailed(1))
+    with pytest.raises(LookupFailed):
+        runmeonce(1)
+    assert calls_made == []
+
+
+def test_many_cached_exceptions():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=LookupFailed, track_size=True)
+    def runmeonce(a):
+        calls_made.append(a)
+        if a:
+            raise LookupFailed(a)
+        return a
+
+    runmeonce.many([(0,), (1,)], return_exceptions=True)
+    results = runmeonce.many([(0,), (1,)], return_exceptions=True)
+    assert results[0] == 0
+    assert isinstance(results[1], LookupFailed)
+    assert calls_made == [0, 1]
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+from django.contrib.auth.models import User
+
+from cache_memoize import cache_memoize
+
+# Modules that are slow to import and that `import cache_memoize` (and
+# decorating a function) shouldn't need.
+HEAVY_MODULES = ("django.db.models", "django.forms", "django.template", "sqlite3")
+
+
+def importtime(code):
+    """Run `code` in a fresh interpreter with `-X importtime` and return the
+    cumulative import time, in microseconds, of every imported module."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_doesnt_import_heavy_modules():
+    times = importtime(
+        "import cache_memoize\n"
+        "@cache_memoize.cache_memoize(10)\n"
+        "def f(a):\n"
+        "    return a\n"
+    )
+    assert "cache_memoize" in times
+    imported = [
+        name for name in times if any(name.startswith(m) for m in HEAVY_MODULES)
+    ]
+    assert imported == []
+
+
+def test_model_instances_in_extra():
+    @cache_memoize(10, extra=lambda user: {"user": user})
+    def runmeonce(user):
+        return user.pk
+
+    assert runmeonce.get_cache_key(User(pk=1)) != runmeonce.get_cache_key(User(pk=2))
+    assert runmeonce.get_cache_key(User(pk=1)) == runmeonce.get_cache_key(User(pk=1))
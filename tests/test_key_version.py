@@ -0,0 +1,85 @@
+import pytest
+from django.core.cache import cache
+
+from cache_memoize import cache_memoize
+
+
+def test_key_version_2():
+    calls_made = []
+
+    @cache_memoize(10, key_version=2)
+    def runmeonce(a, b=None):
+        calls_made.append((a, b))
+        return a
+
+    runmeonce(1, b="x:y")
+    runmeonce(1, b="x:y")
+    runmeonce("1:b=x", b="y")
+    assert calls_made == [(1, "x:y"), ("1:b=x", "y")]
+
+    key = runmeonce.get_cache_key(1, b="x:y")
+    assert len(key) == 32
+    assert cache.get(key) == 1
+
+    @cache_memoize(10)
+    def runmetwice(a, b=None):
+        return a
+
+    # Same function name and arguments, but a different key.
+    assert runmetwice.get_cache_key(1, b="x:y") != key
+
+
+def test_unknown_key_version():
+    with pytest.raises(ValueError):
+
+        @cache_memoize(10, key_version=3)
+        def runmeonce(a):
+            return a
+
+    with pytest.raises(ValueError):
+
+        @cache_memoize(10, key_version=2, migrate_from=0)
+        def runmetwice(a):
+            return a
+
+
+def test_migrate_from():
+    calls_made = []
+
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    old = cache_memoize(10)(runmeonce)
+    new = cache_memoize(10, key_version=2, migrate_from=1)(runmeonce)
+
+    assert old(1) == 2
+    assert calls_made == [1]
+    # Found by the old key and copied over to the new key.
+    assert new(1) == 2
+    assert calls_made == [1]
+    assert cache.get(new.get_cache_key(1)) == 2
+
+    cache.delete(old.get_cache_key(1))
+    assert new(1) == 2
+    assert calls_made == [1]
+
+    assert new(2) == 4
+    assert calls_made == [1, 2]
+    assert cache.get(old.get_cache_key(2)) is None
+
+    old(3)
+    new.invalidate(3)
+    assert cache.get(old.get_cache_key(3)) is None
+    assert new(3) == 6
+    assert calls_made == [1, 2, 3, 3]
+
+
+def test_migrate_from_with_key_generator_callable():
+    with pytest.raises(ValueError):
+
+        @cache_memoize(
+            10, key_version=2, migrate_from=1, key_generator_callable=lambda a: a
+        )
+        def runmeonce(a):
+            return a
@@ -0,0 +1,192 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize, flush_writes
+
+
+def test_many():
+    calls_made = []
+    hits = []
+    misses = []
+
+    @cache_memoize(
+        10,
+        cache_alias="simulated",
+        hit_callable=lambda a: hits.append(a),
+        miss_callable=lambda a: misses.append(a),
+    )
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    backend = caches["simulated"]
+    runmeonce(1)
+    backend.reset_calls()
+
+    assert runmeonce.many([(1,), (2,), (3,), (2,)]) == [2, 4, 6, 4]
+    assert sorted(calls_made) == [1, 2, 3]
+    assert hits == [1]
+    assert sorted(misses) == [1, 2, 3]
+    assert backend.calls["get_many"] == 1
+    assert backend.calls["set_many"] == 1
+    assert backend.calls["get"] == 0
+    assert backend.calls["set"] == 0
+
+    # All hits, and no writes.
+    backend.reset_calls()
+    assert runmeonce.many([(3,), (1,)]) == [6, 2]
+    assert sorted(calls_made) == [1, 2, 3]
+    assert backend.calls["set_many"] == 0
+    assert runmeonce(2) == 4
+    assert sorted(calls_made) == [1, 2, 3]
+
+
+def test_many_in_parallel():
+    running = []
+    lock = threading.Lock()
+
+    @cache_memoize(10)
+    def runmeonce(a):
+        with lock:
+            running.append(a)
+        time.sleep(0.1)
+        return a
+
+    t0 = time.perf_counter()
+    assert runmeonce.many([(i,) for i in range(5)], max_workers=5) == list(
+        range(5)
+    )
+    # From the sum of the compute times to the max.
+    assert time.perf_counter() - t0 < 0.3
+    assert sorted(running) == list(range(5))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert runmeonce.many([(5,), (6,), (1,)], executor=executor) == [5, 6, 1]
+
+
+def test_many_timeout():
+    calls_made = []
+
+    @cache_memoize(10)
+    def runmeonce(a):
+        time.sleep(a)
+        calls_made.append(a)
+        return a
+
+    with pytest.raises(TimeoutError):
+        runmeonce.many([(0,), (0.5,)], max_workers=2, compute_timeout=0.2)
+
+    results = runmeonce.many(
+        [(0,), (0.4,)], max_workers=2, compute_timeout=0.2, return_exceptions=True
+    )
+    assert results[0] == 0
+    assert isinstance(results[1], TimeoutError)
+    # Results that were done in time are stored, the others aren't.
+    assert caches["default"].get(runmeonce.get_cache_key(0)) == 0
+    assert caches["default"].get(runmeonce.get_cache_key(0.4)) is None
+
+
+def test_many_exceptions():
+    calls_made = []
+
+    @cache_memoize(10, cache_exceptions=(ValueError,))
+    def runmeonce(a):
+        calls_made.append(a)
+        if a == 1:
+            raise ValueError(a)
+        if a == 2:
+            raise TypeError(a)
+        return a
+
+    with pytest.raises(ValueError):
+        runmeonce.many([(0,), (1,)], max_workers=2)
+    results = runmeonce.many([(0,), (1,), (2,)], return_exceptions=True)
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], TypeError)
+    # The ValueError was cached, the TypeError not.
+    assert sorted(calls_made) == [0, 1, 2]
+    runmeonce.many([(1,), (2,)], return_exceptions=True)
+    assert sorted(calls_made) == [0, 1, 2, 2]
+
+
+def test_many_generator_function():
+    @cache_memoize(10)
+    def runmeonce(a):
+        yield a
+
+    with pytest.raises(TypeError):
+        runmeonce.many([(1,)])
+
+
+def test_many_migrate_from():
+    calls_made = []
+
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    old = cache_memoize(10, cache_alias="simulated")(runmeonce)
+    new = cache_memoize(10, cache_alias="simulated", key_version=2, migrate_from=1)(
+        runmeonce
+    )
+    backend = caches["simulated"]
+    old(1)
+    backend.reset_calls()
+
+    assert new.many([(1,), (2,)]) == [2, 4]
+    assert calls_made == [1, 2]
+    assert backend.calls["get_many"] == 1
+    assert backend.calls["set_many"] == 1
+    # Copied over to the new key.
+    assert backend.get(new.get_cache_key(1)) == 2
+    assert backend.get(old.get_cache_key(2)) is None
+
+
+def test_many_async_write():
+    @cache_memoize(10, cache_alias="simulated", async_write=True)
+    def runmeonce(a):
+        return a * 2
+
+    backend = caches["simulated"]
+    assert runmeonce.many([(1,), (2,)]) == [2, 4]
+    assert flush_writes(timeout=5)
+    assert backend.calls["set_many"] == 0
+    assert backend.calls["set"] == 2
+    assert backend.get(runmeonce.get_cache_key(2)) == 4
+
+
+def test_many_sliding(monkeypatch):
+    touches = []
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    monkeypatch.setattr(
+        caches["default"], "touch", lambda key, timeout: touches.append(key)
+    )
+
+    @cache_memoize(100, sliding=True)
+    def runmeonce(a):
+        return a * 2
+
+    runmeonce.many([(1,), (2,)])
+    # Just set, no need to touch yet.
+    runmeonce.many([(1,), (2,)])
+    assert touches == []
+    now[0] += 30
+    runmeonce.many([(1,), (2,), (1,)])
+    assert sorted(touches) == sorted(
+        [runmeonce.get_cache_key(1), runmeonce.get_cache_key(2)]
+    )
+
+
+def test_many_adaptive():
+    @cache_memoize(10, adaptive=True)
+    def runmeonce(a):
+        return a
+
+    with pytest.raises(TypeError):
+        runmeonce.many([(1,)])
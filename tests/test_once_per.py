@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize
+
+
+def test_once_per():
+    calls_made = []
+    hits = []
+
+    @cache_memoize(once_per=0.2, cache_alias="simulated", hit_callable=hits.append)
+    def send_email(to):
+        calls_made.append(to)
+        return "sent"
+
+    backend = caches["simulated"]
+    assert send_email("peter") == "sent"
+    assert backend.calls["add"] == 1
+    assert backend.calls["get"] == 0
+    assert send_email("peter") is None
+    assert send_email("paul") == "sent"
+    assert calls_made == ["peter", "paul"]
+    assert hits == ["peter"]
+
+    time.sleep(0.25)
+    assert send_email("peter") == "sent"
+    assert calls_made == ["peter", "paul", "peter"]
+
+    send_email.invalidate("peter")
+    assert send_email("peter") == "sent"
+    assert send_email("peter", _refresh=True) == "sent"
+    assert calls_made == ["peter", "paul", "peter", "peter", "peter"]
+
+
+def test_once_per_concurrently():
+    calls_made = []
+    barrier = threading.Barrier(10)
+
+    @cache_memoize(once_per=10)
+    def send_email(to):
+        calls_made.append(to)
+
+    def run():
+        barrier.wait()
+        send_email("peter")
+
+    threads = [threading.Thread(target=run) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls_made == ["peter"]
+
+
+def test_max_calls():
+    calls_made = []
+
+    @cache_memoize(once_per=0.2, max_calls=3)
+    def send_email(to):
+        calls_made.append(to)
+
+    for _ in range(5):
+        send_email("peter")
+    assert calls_made == ["peter"] * 3
+
+    time.sleep(0.25)
+    for _ in range(5):
+        send_email("peter")
+    assert calls_made == ["peter"] * 6
+
+
+def test_once_per_exception():
+    calls_made = []
+
+    @cache_memoize(once_per=10)
+    def send_email(to):
+        calls_made.append(to)
+        if len(calls_made) == 1:
+            raise ConnectionError
+
+    # A call that failed doesn't count.
+    with pytest.raises(ConnectionError):
+        send_email("peter")
+    send_email("peter")
+    send_email("peter")
+    assert calls_made == ["peter", "peter"]
+
+
+def test_once_per_generator_function():
+    with pytest.raises(ValueError):
+
+        @cache_memoize(once_per=10)
+        def send_emails(to):
+            yield to
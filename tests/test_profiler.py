@@ -0,0 +1,127 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from cache_memoize import (
+    CircuitBreaker,
+    cache_memoize,
+    get_profiles,
+    publish_profiles,
+)
+from cache_memoize.profiler import FunctionProfile
+
+from .backends import simulated
+
+
+def test_profile():
+    @cache_memoize(10, profile=True, args_rewrite=lambda a, b: (a,))
+    def runmeonce(a, b):
+        return "x" * a
+
+    for i in range(5):
+        runmeonce(100, i)
+    runmeonce(10, 0)
+    runmeonce(10, 0)
+
+    profile = runmeonce.profile
+    assert get_profiles()[profile.name] is profile
+    assert profile.samples == 7
+    top = profile.top(2)
+    assert top[0]["args"] == "100"
+    assert top[0]["count"] == 5
+    assert top[0]["hits"] == 4
+    assert top[0]["misses"] == 1
+    assert top[0]["size"] > 100
+    assert top[0]["cache_key"] == runmeonce.get_cache_key(100, 0)
+    assert top[1]["args"] == "10"
+    assert top[1]["count"] == 2
+    assert profile.top(1, by="size")[0]["args"] == "100"
+
+
+def test_profile_sampling():
+    @cache_memoize(10, profile=0.0001)
+    def runmeonce(a):
+        return a
+
+    for i in range(100):
+        runmeonce(1)
+    assert runmeonce.profile.samples < 100
+
+
+def test_no_profile():
+    @cache_memoize(10)
+    def runmeonce(a):
+        return a
+
+    assert runmeonce.profile is None
+
+
+def test_function_profile_space_saving():
+    profile = FunctionProfile("test", capacity=2)
+    for key in "aaab":
+        profile.record(key, key, hit=True)
+    profile.record("c", "c", hit=False)
+    top = profile.top()
+    # "b" was the least frequent, "c" took its place and its count.
+    assert [(s["cache_key"], s["count"], s["error"]) for s in top] == [
+        ("a", 3, 0),
+        ("c", 2, 1),
+    ]
+
+
+def test_management_command():
+    @cache_memoize(10, profile=True)
+    def runmeonce(a):
+        return a * 2
+
+    runmeonce(1)
+    runmeonce(1)
+    runmeonce(2)
+    publish_profiles("default")
+
+    stdout = StringIO()
+    call_command(
+        "cache_memoize_profile", "--function", "test_management_command", stdout=stdout
+    )
+    output = stdout.getvalue()
+    assert runmeonce.profile.name in output
+    assert "(3 samples)" in output
+    lines = output.splitlines()
+    assert lines[2].split() == ["2", "1", "1", "0.000", "5", "1"]
+
+
+def test_management_command_nothing_published():
+    stdout = StringIO()
+    call_command("cache_memoize_profile", stdout=stdout)
+    assert "No published profiles found." in stdout.getvalue()
+
+
+def test_publish_through_circuit_breaker(monkeypatch):
+    monkeypatch.setattr("cache_memoize.profiler.PROFILE_PUBLISH_INTERVAL", -1)
+    breaker = CircuitBreaker(failure_threshold=100)
+
+    @cache_memoize(10, cache_alias="simulated", profile=True, circuit_breaker=breaker)
+    def runmeonce(a):
+        return a * 2
+
+    with simulated(FAILURE_RATE=1):
+        assert runmeonce(1) == 2
+        assert runmeonce(1) == 2
+    # Per call a get and a set, and publishing's set, get and set.
+    assert breaker._failures == 10
+
+
+def test_publish_failure_doesnt_reach_caller(monkeypatch):
+    monkeypatch.setattr("cache_memoize.profiler.PROFILE_PUBLISH_INTERVAL", -1)
+
+    def publish_profiles(cache_alias, circuit_breaker=None):
+        raise ConnectionError
+
+    monkeypatch.setattr("cache_memoize.profiler.publish_profiles", publish_profiles)
+
+    @cache_memoize(10, profile=True)
+    def runmeonce(a):
+        return a * 2
+
+    assert runmeonce(1) == 2
+    assert runmeonce(1) == 2
@@ -0,0 +1,151 @@
+import math
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import CircuitBreaker, cache_memoize
+from cache_memoize.replication import FASTEST, ReplicaSelector
+
+from .backends import simulated
+
+
+def test_replicas():
+    calls_made = []
+
+    @cache_memoize(10, cache_alias="simulated", replicas=["simulated_other"])
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    for _ in range(50):
+        assert runmeonce(1) == 1
+    assert calls_made == [1]
+    key = runmeonce.get_cache_key(1)
+    for alias in ("simulated", "simulated_other"):
+        assert caches[alias].get(key) == 1
+        # The reads are spread over both.
+        assert caches[alias].calls["get"] > 5
+        assert caches[alias].calls["set"] == 1
+
+    runmeonce.invalidate(1)
+    assert caches["simulated"].get(key) is None
+    assert caches["simulated_other"].get(key) is None
+    runmeonce(1)
+    assert calls_made == [1, 1]
+
+
+def test_replica_catches_up():
+    calls_made = []
+
+    @cache_memoize(10, cache_alias="default", replicas=["other"])
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    runmeonce(1)
+    key = runmeonce.get_cache_key(1)
+    caches["other"].delete(key)
+    for _ in range(20):
+        runmeonce(1)
+    # Read from the primary and copied to the replica, not computed again.
+    assert calls_made == [1]
+    assert caches["other"].get(key) == 1
+
+
+def test_fastest_replica(monkeypatch):
+    monkeypatch.setattr("cache_memoize.replication.EXPLORE_RATE", 0)
+
+    @cache_memoize(
+        10,
+        cache_alias="simulated",
+        replicas=["simulated_other"],
+        replica_reads=FASTEST,
+    )
+    def runmeonce(a):
+        return a
+
+    runmeonce(1)
+    runmeonce.replicas.latencies.update(simulated=1.0, simulated_other=0.001)
+    caches["simulated"].reset_calls()
+    caches["simulated_other"].reset_calls()
+    for _ in range(10):
+        runmeonce(1)
+    assert caches["simulated"].calls["get"] == 0
+    assert caches["simulated_other"].calls["get"] == 10
+    assert runmeonce.replicas.latencies["simulated_other"] < 0.001
+
+
+def test_fastest_replica_unavailable(monkeypatch):
+    monkeypatch.setattr("cache_memoize.replication.EXPLORE_RATE", 0)
+    calls_made = []
+
+    @cache_memoize(
+        10,
+        cache_alias="simulated",
+        replicas=["simulated_other"],
+        replica_reads=FASTEST,
+        circuit_breaker=CircuitBreaker(failure_threshold=100),
+    )
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    runmeonce(1)
+    runmeonce.replicas.latencies.update(simulated=0.001, simulated_other=1.0)
+    caches["simulated_other"].reset_calls()
+    with simulated(FAILURE_RATE=1):
+        for _ in range(10):
+            assert runmeonce(1) == 1
+        assert runmeonce.many([(1,)]) == [1]
+    # The failed read went to the other one instead, which is the fastest now.
+    assert calls_made == [1]
+    assert runmeonce.replicas.latencies["simulated"] == math.inf
+    assert caches["simulated_other"].calls["get"] == 10
+    assert caches["simulated_other"].calls["get_many"] == 1
+
+
+def test_replica_selector(monkeypatch):
+    monkeypatch.setattr("cache_memoize.replication.EXPLORE_RATE", 0)
+    selector = ReplicaSelector(["a", "b"], FASTEST)
+    # Not read from yet, so tried first.
+    selector.record("a", 0.01)
+    assert selector.latencies["b"] == 0
+    selector.record("b", 0.02)
+    selector.record("b", 0.01)
+    assert selector.latencies["b"] == pytest.approx(0.018)
+    selector.record_failure("a")
+    assert selector.order() == ["b", "a"]
+    selector.record("a", 0.01)
+    assert selector.latencies["a"] == 0.01
+
+    with pytest.raises(ValueError):
+        ReplicaSelector(["a", "b"], "nearest")
+
+
+def test_replicas_many():
+    @cache_memoize(10, cache_alias="simulated", replicas=["simulated_other"])
+    def runmeonce(a):
+        return a
+
+    args = [(i,) for i in range(10)]
+    assert runmeonce.many(args) == list(range(10))
+    assert runmeonce.many(args) == list(range(10))
+    for alias in ("simulated", "simulated_other"):
+        assert caches[alias].calls["set_many"] == 1
+    # One get_many per batch, from either.
+    assert (
+        caches["simulated"].calls["get_many"]
+        + caches["simulated_other"].calls["get_many"]
+    ) >= 2
+
+
+def test_replicas_not_supported():
+    with pytest.raises(ValueError):
+        cache_memoize(10, cache_alias=["default", "other"], replicas=["simulated"])
+    with pytest.raises(ValueError):
+        cache_memoize(10, replicas=["other"], track_dependencies=True)
+    with pytest.raises(ValueError):
+
+        @cache_memoize(10, replicas=["other"], once_per=10)
+        def runmeonce(a):
+            return a
@@ -0,0 +1,107 @@
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize
+from cache_memoize.sharding import HashRing
+
+
+def test_hash_ring():
+    ring = HashRing(["default", "other"])
+    keys = ["key{}".format(i) for i in range(1000)]
+    groups = ring.group(keys)
+    assert set(groups) == {"default", "other"}
+    assert 350 < len(groups["default"]) < 650
+    assert all(ring.get(key) == "other" for key in groups["other"])
+    # The same on every run (and in every process).
+    assert HashRing(["default", "other"]).group(keys) == groups
+
+
+def test_hash_ring_rebalancing():
+    keys = ["key{}".format(i) for i in range(3000)]
+    before = HashRing(["a", "b"])
+    after = HashRing(["a", "b", "c"])
+    moved = [key for key in keys if before.get(key) != after.get(key)]
+    # About a third of the keys move, and only to the new alias.
+    assert 700 < len(moved) < 1300
+    assert all(after.get(key) == "c" for key in moved)
+
+
+def test_sharded():
+    calls_made = []
+
+    @cache_memoize(10, cache_alias=["default", "other"])
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    for i in range(20):
+        runmeonce(i)
+        runmeonce(i)
+    assert calls_made == list(range(20))
+
+    in_default = [
+        i
+        for i in range(20)
+        if caches["default"].get(runmeonce.get_cache_key(i)) is not None
+    ]
+    in_other = [
+        i
+        for i in range(20)
+        if caches["other"].get(runmeonce.get_cache_key(i)) is not None
+    ]
+    assert in_default and in_other
+    assert sorted(in_default + in_other) == list(range(20))
+
+    runmeonce.invalidate(in_other[0])
+    assert caches["other"].get(runmeonce.get_cache_key(in_other[0])) is None
+    runmeonce(in_other[0])
+    assert len(calls_made) == 21
+
+
+def test_sharded_adding_alias():
+    calls_made = []
+
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    before = cache_memoize(10, cache_alias=["default"])(runmeonce)
+    after = cache_memoize(10, cache_alias=["default", "other"])(runmeonce)
+    for i in range(20):
+        before(i)
+    calls_made.clear()
+    for i in range(20):
+        after(i)
+    # Only the keys that now belong to the new alias are computed again.
+    moved = [
+        i for i in range(20) if caches["other"].get(after.get_cache_key(i)) is not None
+    ]
+    assert calls_made == moved
+    assert 0 < len(moved) < 20
+
+
+def test_sharded_many():
+    calls_made = []
+
+    @cache_memoize(10, cache_alias=["simulated", "simulated_other"])
+    def runmeonce(a):
+        calls_made.append(a)
+        return a
+
+    args = [(i,) for i in range(20)]
+    assert runmeonce.many(args) == list(range(20))
+    assert runmeonce.many(args) == list(range(20))
+    assert sorted(calls_made) == list(range(20))
+    for alias in ("simulated", "simulated_other"):
+        # One of each per shard, per batch.
+        assert caches[alias].calls["get_many"] == 2
+        assert caches[alias].calls["set_many"] == 1
+
+
+def test_sharded_circuit_breaker():
+    @cache_memoize(10, cache_alias=["default", "other"], circuit_breaker=True)
+    def runmeonce(a):
+        return a
+
+    for i in range(10):
+        assert runmeonce(i) == i
+        assert runmeonce(i) == i
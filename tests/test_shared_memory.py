@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.test import override_settings
+
+from cache_memoize import cache_memoize
+from cache_memoize.backends.shared_memory import SharedMemoryCache
+
+BACKEND = "cache_memoize.backends.shared_memory.SharedMemoryCache"
+
+
+def make_cache(path, **options):
+    return SharedMemoryCache(str(path), {"OPTIONS": options})
+
+
+def test_basics(tmp_path):
+    cache = make_cache(tmp_path / "cache")
+    assert cache.get("foo") is None
+    assert cache.get("foo", "default") == "default"
+    cache.set("foo", {"bar": [1, 2, 3]})
+    assert cache.get("foo") == {"bar": [1, 2, 3]}
+    assert cache.has_key("foo")
+    assert not cache.add("foo", "other")
+    assert cache.add("new", "value")
+    assert cache.get("new") == "value"
+    cache.set("number", 10)
+    assert cache.incr("number", 5) == 15
+    assert cache.get("number") == 15
+    with pytest.raises(ValueError):
+        cache.incr("missing")
+    assert cache.delete("foo")
+    assert not cache.delete("foo")
+    assert cache.get("foo") is None
+    cache.clear()
+    assert cache.get("new") is None
+
+
+def test_shared_between_instances(tmp_path):
+    one = make_cache(tmp_path / "cache")
+    two = make_cache(tmp_path / "cache")
+    one.set("foo", "bar")
+    assert two.get("foo") == "bar"
+    two.delete("foo")
+    assert one.get("foo") is None
+
+
+def test_other_options_refused(tmp_path):
+    one = make_cache(tmp_path / "cache", SLOTS=8)
+    one.set("foo", "bar")
+    # It may still be in use, so it's left alone.
+    with pytest.raises(InvalidCacheBackendError):
+        make_cache(tmp_path / "cache", SLOTS=16).get("foo")
+    assert one.get("foo") == "bar"
+    (tmp_path / "other").write_bytes(b"something else")
+    with pytest.raises(InvalidCacheBackendError):
+        make_cache(tmp_path / "other").get("foo")
+    assert (tmp_path / "other").read_bytes() == b"something else"
+
+
+def test_expiration(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    cache = make_cache(tmp_path / "cache")
+    cache.set("foo", "bar", 10)
+    cache.set("forever", "bar", None)
+    now[0] += 5
+    assert cache.touch("foo", 10)
+    now[0] += 9
+    assert cache.get("foo") == "bar"
+    now[0] += 2
+    assert cache.get("foo") is None
+    assert not cache.touch("foo")
+    assert cache.get("forever") == "bar"
+    # The expired slot gets reused.
+    assert cache.add("foo", "again")
+
+
+def test_too_big_values(tmp_path):
+    cache = make_cache(tmp_path / "cache", SLOT_SIZE=256)
+    cache.set("foo", "small")
+    cache.set("foo", "x" * 1000)
+    assert cache.get("foo") is None
+    assert not cache.add("bar", "x" * 1000)
+
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path / "cache", SLOTS=4, PROBE_LIMIT=4)
+    for key in "abcd":
+        cache.set(key, key)
+    cache.get("a")
+    cache.set("e", "e")
+    # "b" was the least recently used.
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acde"] == list("acde")
+
+
+def test_deleted_slots_keep_probing(tmp_path):
+    cache = make_cache(tmp_path / "cache", SLOTS=1, PROBE_LIMIT=1)
+    cache.set("a", 1)
+    cache.delete("a")
+    cache.set("b", 2)
+    assert cache.get("b") == 2
+    assert cache.get("a") is None
+
+
+def memoized_pid(path):
+    with override_settings(
+        CACHES={"shared": {"BACKEND": BACKEND, "LOCATION": path}}
+    ):
+
+        @cache_memoize(100, cache_alias="shared", prefix="memoized_pid")
+        def pid():
+            return os.getpid()
+
+        return pid()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache")
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(4, mp_context=context) as executor:
+        first = executor.submit(memoized_pid, path).result()
+        pids = list(executor.map(memoized_pid, [path] * 20))
+    assert first != os.getpid()
+    assert set(pids) == {first}
+
+
+_forked_cache = None
+
+
+def incr_in_child(times):
+    for _ in range(times):
+        _forked_cache.incr("counter")
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_forked_processes_exclude_each_other(tmp_path):
+    global _forked_cache
+    # Opened in this process before forking.
+    _forked_cache = make_cache(tmp_path / "cache")
+    _forked_cache.set("counter", 0)
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(4, mp_context=context) as executor:
+        list(executor.map(incr_in_child, [500] * 4))
+    assert _forked_cache.get("counter") == 2000
+
+
+def test_as_cache_alias(tmp_path):
+    calls_made = []
+    with override_settings(
+        CACHES={"shared": {"BACKEND": BACKEND, "LOCATION": str(tmp_path / "c")}}
+    ):
+
+        @cache_memoize(10, cache_alias="shared")
+        def runmeonce(a):
+            calls_made.append(a)
+            return a * 2
+
+        assert runmeonce(1) == 2
+        assert runmeonce(1) == 2
+        assert len(calls_made) == 1
+        runmeonce.invalidate(1)
+        assert caches["shared"].get(runmeonce.get_cache_key(1)) is None
@@ -0,0 +1,103 @@
+import pytest
+from django.core.cache import cache
+
+from cache_memoize import cache_memoize, get_size_stats, heaviest_functions
+from cache_memoize.sizes import CompressedValue
+
+
+def test_track_size():
+    @cache_memoize(10, track_size=True)
+    def runmeonce(a):
+        return "x" * a
+
+    runmeonce(100)
+    runmeonce(100)
+    runmeonce(1000)
+    stats = runmeonce.size_stats
+    assert get_size_stats()[stats.name] is stats
+    assert stats.stored == 2
+    assert 1100 < stats.total_size < 1200
+    assert 1000 < stats.max_size < 1100
+    assert stats.average_size == stats.total_size / 2
+
+
+def test_max_item_size_skip():
+    calls_made = []
+
+    @cache_memoize(10, max_item_size=500)
+    def runmeonce(a):
+        calls_made.append(a)
+        return "x" * a
+
+    assert runmeonce(100) == "x" * 100
+    assert runmeonce(100) == "x" * 100
+    assert len(calls_made) == 1
+    assert runmeonce(1000) == "x" * 1000
+    assert runmeonce(1000) == "x" * 1000
+    assert len(calls_made) == 3
+    assert cache.get(runmeonce.get_cache_key(1000)) is None
+    assert runmeonce.size_stats.skipped == 2
+
+
+def test_max_item_size_compress():
+    calls_made = []
+
+    @cache_memoize(10, max_item_size=500, oversize="compress")
+    def runmeonce(a):
+        calls_made.append(a)
+        return "x" * a
+
+    assert runmeonce(1000) == "x" * 1000
+    assert isinstance(cache.get(runmeonce.get_cache_key(1000)), CompressedValue)
+    assert runmeonce(1000) == "x" * 1000
+    assert len(calls_made) == 1
+    assert runmeonce.size_stats.compressed == 1
+    assert runmeonce.size_stats.max_size < 500
+
+
+def test_compressed_value_without_max_item_size():
+    calls_made = []
+
+    def runmeonce(a):
+        calls_made.append(a)
+        return "x" * a
+
+    compressing = cache_memoize(
+        10, prefix="runmeonce", max_item_size=500, oversize="compress"
+    )(runmeonce)
+    # Same key, e.g. after `max_item_size` was removed from the decorator.
+    plain = cache_memoize(10, prefix="runmeonce")(runmeonce)
+    assert compressing(1000) == "x" * 1000
+    assert plain(1000) == "x" * 1000
+    assert len(calls_made) == 1
+
+
+def test_max_item_size_compress_not_enough():
+    @cache_memoize(10, max_item_size=10, oversize="compress")
+    def runmeonce(a):
+        return "x" * a
+
+    runmeonce(1000)
+    assert cache.get(runmeonce.get_cache_key(1000)) is None
+    assert runmeonce.size_stats.skipped == 1
+
+
+def test_invalid_oversize():
+    with pytest.raises(ValueError):
+        cache_memoize(10, max_item_size=10, oversize="truncate")(lambda: None)
+
+
+def test_heaviest_functions():
+    @cache_memoize(10, track_size=True, prefix="test_heaviest_functions.light")
+    def light():
+        return "x"
+
+    @cache_memoize(10, track_size=True, prefix="test_heaviest_functions.heavy")
+    def heavy():
+        return "x" * 100_000
+
+    light()
+    heavy()
+    names = [s["name"] for s in heaviest_functions(100)]
+    assert names.index(heavy.size_stats.name) < names.index(light.size_stats.name)
+    assert heaviest_functions(1)[0]["total_size"] >= 100_000
@@ -0,0 +1,116 @@
+import types
+
+from django.core.cache import caches
+
+from cache_memoize import cache_memoize
+from cache_memoize.streaming import StreamManifest, chunk_key
+
+
+def test_memoize_generator():
+    calls_made = []
+
+    @cache_memoize(10, stream_chunk_size=3, stream_window=2)
+    def rows(n):
+        calls_made.append(n)
+        for i in range(n):
+            yield {"row": i}
+
+    result = rows(10)
+    assert isinstance(result, types.GeneratorType)
+    assert list(result) == [{"row": i} for i in range(10)]
+    assert len(calls_made) == 1
+
+    cache = caches["default"]
+    cache_key = rows.get_cache_key(10)
+    manifest = cache.get(cache_key)
+    assert isinstance(manifest, StreamManifest)
+    assert (manifest.chunks, manifest.items) == (4, 10)
+    assert cache.get(chunk_key(cache_key, 3)) == [{"row": 9}]
+
+    assert list(rows(10)) == [{"row": i} for i in range(10)]
+    assert len(calls_made) == 1
+    assert list(rows(0)) == []
+    assert list(rows(0)) == []
+    assert len(calls_made) == 2
+
+
+def test_memoize_generator_fetches_chunks_in_windows():
+    @cache_memoize(10, cache_alias="simulated", stream_chunk_size=2, stream_window=3)
+    def rows(n):
+        yield from range(n)
+
+    list(rows(12))
+    backend = caches["simulated"]
+    backend.reset_calls()
+    assert list(rows(12)) == list(range(12))
+    # One get for the manifest, 6 chunks fetched 3 at a time.
+    assert backend.calls == {"get": 1, "get_many": 2}
+
+
+def test_memoize_generator_not_consumed():
+    calls_made = []
+
+    @cache_memoize(10, stream_chunk_size=2)
+    def rows(n):
+        calls_made.append(n)
+        yield from range(n)
+
+    iterator = rows(10)
+    assert next(iterator) == 0
+    iterator.close()
+    # Partially consumed streams are not stored.
+    assert caches["default"].get(rows.get_cache_key(10)) is None
+    assert list(rows(10)) == list(range(10))
+    assert len(calls_made) == 2
+
+
+def test_memoize_generator_missing_chunk():
+    calls_made = []
+
+    @cache_memoize(10, stream_chunk_size=2, stream_window=1)
+    def rows(n):
+        calls_made.append(n)
+        yield from range(n)
+
+    list(rows(10))
+    cache = caches["default"]
+    cache_key = rows.get_cache_key(10)
+    cache.delete(chunk_key(cache_key, 2))
+    # Continues where the stored chunks ended by computing it again.
+    assert list(rows(10)) == list(range(10))
+    assert len(calls_made) == 2
+    assert cache.get(chunk_key(cache_key, 2)) == [4, 5]
+
+
+def test_memoize_generator_invalidate_and_refresh():
+    calls_made = []
+
+    @cache_memoize(10, stream_chunk_size=2)
+    def rows(n):
+        calls_made.append(n)
+        yield from range(n)
+
+    list(rows(5))
+    list(rows(5, _refresh=True))
+    assert len(calls_made) == 2
+    cache_key = rows.get_cache_key(5)
+    rows.invalidate(5)
+    cache = caches["default"]
+    assert cache.get(cache_key) is None
+    assert cache.get(chunk_key(cache_key, 0)) is None
+    list(rows(5))
+    assert len(calls_made) == 3
+
+
+def test_memoize_generator_callables():
+    hits = []
+    misses = []
+
+    @cache_memoize(10, hit_callable=hits.append, miss_callable=misses.append)
+    def rows(n):
+        yield from range(n)
+
+    list(rows(3))
+    list(rows(3))
+    assert hits == [3]
+    assert misses == [3]
@@ -0,0 +1,245 @@
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory
+from django.utils.cache import patch_vary_headers
+
+from cache_memoize import CircuitBreaker
+from cache_memoize.views import cache_memoize_view
+
+from .backends import simulated
+
+factory = RequestFactory()
+
+
+def test_cache_memoize_view():
+    calls_made = []
+
+    @cache_memoize_view(10)
+    def view(request, slug):
+        calls_made.append(slug)
+        response = HttpResponse("Hello {}".format(slug))
+        response["X-Custom"] = "yes"
+        return response
+
+    response = view(factory.get("/page/"), "foo")
+    assert response.status_code == 200
+    assert response.content == b"Hello foo"
+    etag = response["ETag"]
+    assert etag.startswith('"')
+
+    response = view(factory.get("/page/"), "foo")
+    assert response.status_code == 200
+    assert response.content == b"Hello foo"
+    assert response["X-Custom"] == "yes"
+    assert response["ETag"] == etag
+    assert len(calls_made) == 1
+
+    view(factory.get("/page/"), "bar")
+    view(factory.get("/other/"), "foo")
+    assert len(calls_made) == 3
+
+    view.invalidate(factory.get("/page/"), "foo")
+    view(factory.get("/page/"), "foo")
+    assert len(calls_made) == 4
+
+
+def test_cache_memoize_view_not_modified(monkeypatch):
+    @cache_memoize_view(10, cache_alias="simulated")
+    def view(request):
+        return HttpResponse("Hello")
+
+    etag = view(factory.get("/"))["ETag"]
+    backend = caches["simulated"]
+    backend.reset_calls()
+    response = view(factory.get("/", HTTP_IF_NONE_MATCH=etag))
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    # Only the small CachedResponse was fetched, not the content.
+    assert backend.calls == {"get": 1}
+
+    response = view(factory.get("/", HTTP_IF_NONE_MATCH='"other"'))
+    assert response.status_code == 200
+    assert response.content == b"Hello"
+
+
+def test_cache_memoize_view_evicted_content():
+    calls_made = []
+
+    @cache_memoize_view(10)
+    def view(request):
+        calls_made.append(request)
+        return HttpResponse("Hello")
+
+    view(factory.get("/"))
+    cache = caches["default"]
+    # Internally LocMemCache keys are prefixed with ":<version>:".
+    body_keys = [key.split(":", 2)[2] for key in cache._cache if ":body:" in key]
+    assert len(body_keys) == 1
+    cache.delete_many(body_keys)
+    response = view(factory.get("/"))
+    assert response.content == b"Hello"
+    assert len(calls_made) == 2
+    assert view(factory.get("/")).content == b"Hello"
+    assert len(calls_made) == 2
+
+
+def test_cache_memoize_view_vary_on():
+    calls_made = []
+
+    @cache_memoize_view(10, vary_on_headers=("Accept-Language",), vary_on_user=("pk",))
+    def view(request):
+        calls_made.append(request)
+        return HttpResponse(request.headers.get("Accept-Language", ""))
+
+    def get(language, user_id):
+        request = factory.get("/", HTTP_ACCEPT_LANGUAGE=language)
+        request.user = SimpleNamespace(pk=user_id)
+        return view(request)
+
+    assert get("en", 1).content == b"en"
+    assert get("en", 1).content == b"en"
+    assert len(calls_made) == 1
+    assert get("sv", 1).content == b"sv"
+    assert len(calls_made) == 2
+    response = get("sv", 2)
+    assert len(calls_made) == 3
+    assert response["Vary"] == "Accept-Language, Cookie"
+
+
+def test_cache_memoize_view_uncacheable():
+    calls_made = []
+
+    @cache_memoize_view(10)
+    def view(request, status):
+        calls_made.append(status)
+        response = HttpResponse("Hello", status=status)
+        if status == 201:
+            response.set_cookie("session", "secret")
+        return response
+
+    assert view(factory.get("/"), 404).status_code == 404
+    assert view(factory.get("/"), 404).status_code == 404
+    assert view(factory.get("/"), 201).cookies["session"].value == "secret"
+    assert view(factory.get("/"), 201).status_code == 201
+    assert len(calls_made) == 4
+
+
+def test_cache_memoize_view_template_response():
+    calls_made = []
+    template = engines["django"].from_string("Hello {{ name }}")
+
+    @cache_memoize_view(10)
+    def view(request, name):
+        calls_made.append(name)
+        return TemplateResponse(request, template, {"name": name})
+
+    response = view(factory.get("/"), "peter")
+    assert response.content == b"Hello peter"
+    assert view(factory.get("/"), "peter").content == b"Hello peter"
+    assert len(calls_made) == 1
+
+
+def test_cache_memoize_view_private_or_varying():
+    calls_made = []
+
+    @cache_memoize_view(10, vary_on_headers=("Accept-Language",))
+    def view(request, kind):
+        calls_made.append(kind)
+        response = HttpResponse("Hello")
+        if kind == "private":
+            response["Cache-Control"] = "private, max-age=60"
+        elif kind == "cookie":
+            patch_vary_headers(response, ("Cookie",))
+        else:
+            patch_vary_headers(response, ("accept-language",))
+        return response
+
+    for kind in ("private", "cookie", "language"):
+        view(factory.get("/"), kind)
+        view(factory.get("/"), kind)
+    # Only the one varying on what the cache key varies on is memoized.
+    assert calls_made == ["private", "private", "cookie", "cookie", "language"]
+
+
+def test_cache_memoize_view_only_get_and_head():
+    calls_made = []
+
+    @cache_memoize_view(10)
+    def view(request):
+        calls_made.append(request.method)
+        return HttpResponse("Hello")
+
+    view(factory.post("/"))
+    view(factory.post("/"))
+    view(factory.head("/"))
+    view(factory.head("/"))
+    assert calls_made == ["POST", "POST", "HEAD"]
+
+
+def test_views_with_the_same_etag():
+    def make_view(content):
+        @cache_memoize_view(10, prefix=content)
+        def view(request):
+            response = HttpResponse(content)
+            response["ETag"] = '"1"'
+            return response
+
+        return view
+
+    view_a = make_view("page A")
+    view_b = make_view("page B")
+    view_a(factory.get("/a/"))
+    view_b(factory.get("/b/"))
+    assert view_a(factory.get("/a/")).content == b"page A"
+    assert view_b(factory.get("/b/")).content == b"page B"
+
+
+def test_weak_etag():
+    @cache_memoize_view(10)
+    def view(request):
+        response = HttpResponse("Hello")
+        response["ETag"] = 'W/"v1"'
+        return response
+
+    view(factory.get("/"))
+    response = view(factory.get("/", HTTP_IF_NONE_MATCH='W/"v1"'))
+    assert response.status_code == 304
+    response = view(factory.get("/", HTTP_IF_NONE_MATCH='"v1"'))
+    assert response.status_code == 304
+    response = view(factory.get("/", HTTP_IF_NONE_MATCH='"v2"'))
+    assert response.status_code == 200
+
+
+def test_view_sharded():
+    calls_made = []
+
+    @cache_memoize_view(10, cache_alias=["default", "other"])
+    def view(request, slug):
+        calls_made.append(slug)
+        return HttpResponse("Hello {}".format(slug))
+
+    for slug in "abcdef":
+        view(factory.get("/"), slug)
+    for slug in "abcdef":
+        assert view(factory.get("/"), slug).content == "Hello {}".format(
+            slug
+        ).encode()
+    assert calls_made == list("abcdef")
+
+
+def test_view_circuit_breaker():
+    calls_made = []
+
+    @cache_memoize_view(10, cache_alias="simulated", circuit_breaker=CircuitBreaker())
+    def view(request):
+        calls_made.append(1)
+        return HttpResponse("Hello")
+
+    with simulated(FAILURE_RATE=1):
+        assert view(factory.get("/")).content == b"Hello"
+        assert view(factory.get("/")).content == b"Hello"
+    assert len(calls_made) == 2
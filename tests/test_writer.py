@@ -0,0 +1,157 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from django.core.cache import caches
+
+from cache_memoize import BackgroundWriter, cache_memoize, flush_writes
+from cache_memoize import writer as writer_module
+from cache_memoize.writer import get_writer
+
+from .backends import simulated
+
+
+def test_async_write():
+    calls_made = []
+
+    @cache_memoize(10, async_write=True)
+    def runmeonce(a):
+        calls_made.append(a)
+        return a * 2
+
+    assert runmeonce(1) == 2
+    assert flush_writes(timeout=5)
+    assert caches["default"].get(runmeonce.get_cache_key(1)) == 2
+    assert runmeonce(1) == 2
+    assert len(calls_made) == 1
+
+
+def test_async_write_store_result_false():
+    @cache_memoize(10, store_result=False, async_write=True)
+    def runmeonce(a):
+        return a * 2
+
+    runmeonce(1)
+    assert flush_writes(timeout=5)
+    assert caches["default"].get(runmeonce.get_cache_key(1)) is True
+
+
+def test_async_write_coalesces_writes():
+    writer = BackgroundWriter()
+    with simulated(LATENCY=0.05):
+        writer.submit("simulated", "first", 1, 10)
+        writer.submit("simulated", "second", 1, 10)
+        writer.submit("simulated", "second", 2, 10)
+        writer.submit("simulated", "third", 3, 10)
+        assert writer.flush(timeout=5)
+        backend = caches["simulated"]
+        assert backend.calls["set"] == 3
+        assert backend.get("second") == 2
+
+
+def test_async_write_drops_when_full():
+    writer = BackgroundWriter(max_pending=1)
+    with simulated(LATENCY=0.05):
+        for i in range(5):
+            writer.submit("simulated", i, i, 10)
+        assert writer.flush(timeout=5)
+        assert writer.dropped >= 3
+        assert caches["simulated"].get(4) is None
+
+
+def test_async_write_flush_timeout():
+    writer = BackgroundWriter()
+    with simulated(LATENCY=0.2):
+        writer.submit("simulated", "key", 1, 10)
+        assert not writer.flush(timeout=0.01)
+        assert writer.flush(timeout=5)
+
+
+def test_async_write_invalidate_discards_pending_write():
+    writer = BackgroundWriter()
+
+    @cache_memoize(10, cache_alias="simulated", async_write=writer)
+    def runmeonce(a):
+        return a * 2
+
+    with simulated(LATENCY=0.05):
+        runmeonce(1)
+        runmeonce(2)
+        runmeonce.invalidate(2)
+        assert writer.flush(timeout=5)
+        backend = caches["simulated"]
+        assert backend.get(runmeonce.get_cache_key(1)) == 2
+        assert backend.get(runmeonce.get_cache_key(2)) is None
+
+
+def test_async_write_invalidate_during_write(monkeypatch):
+    writer = BackgroundWriter()
+    writing = threading.Event()
+    finish = threading.Event()
+    get_cache = writer_module.get_cache
+
+    class SlowCache:
+        def __init__(self, cache_alias):
+            self.cache = get_cache(cache_alias)
+
+        def set(self, *args):
+            writing.set()
+            finish.wait(5)
+            self.cache.set(*args)
+
+    monkeypatch.setattr("cache_memoize.writer.get_cache", SlowCache)
+
+    @cache_memoize(10, async_write=writer)
+    def runmeonce(a):
+        return a * 2
+
+    runmeonce(1)
+    assert writing.wait(5)
+    # Taken off the queue but not written yet.
+    invalidating = threading.Thread(target=runmeonce.invalidate, args=(1,))
+    invalidating.start()
+    invalidating.join(0.1)
+    assert invalidating.is_alive()
+    finish.set()
+    invalidating.join(5)
+    assert writer.flush(timeout=5)
+    assert caches["default"].get(runmeonce.get_cache_key(1)) is None
+
+
+def test_async_write_invalidate_discards_pending_replica_writes():
+    writer = BackgroundWriter()
+
+    @cache_memoize(
+        10, cache_alias="simulated", replicas=["simulated_other"], async_write=writer
+    )
+    def runmeonce(a):
+        return a * 2
+
+    with simulated(LATENCY=0.1):
+        # Keep the writer busy so that the writes of both copies are queued.
+        for i in range(5):
+            writer.submit("simulated", "busy{}".format(i), i, 10)
+        runmeonce(1)
+        runmeonce.invalidate(1)
+        assert writer.flush(timeout=5)
+    key = runmeonce.get_cache_key(1)
+    assert caches["simulated"].get(key) is None
+    assert caches["simulated_other"].get(key) is None
+
+
+def write_in_child():
+    get_writer().submit("default", "forked", 1, 10)
+    return flush_writes(timeout=2), caches["default"].get("forked")
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_async_write_after_fork():
+    # The writer's thread runs in this process before forking.
+    get_writer().submit("default", "parent", 1, 10)
+    assert flush_writes(timeout=2)
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        assert executor.submit(write_in_child).result() == (True, 1)